@@ -0,0 +1,45 @@
+"""add updated_at to tasks and student_task
+
+Revision ID: a2d4f6b8c0e1
+Revises: f1a7c3e5b9d0
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2d4f6b8c0e1'
+down_revision: Union[str, None] = 'f1a7c3e5b9d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Сначала nullable, заполняем, потом NOT NULL
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    with op.batch_alter_table('student_task') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE tasks SET updated_at = CURRENT_TIMESTAMP")
+    op.execute(
+        "UPDATE student_task SET updated_at = COALESCE(graded_at, submitted_at, CURRENT_TIMESTAMP)"
+    )
+
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+    with op.batch_alter_table('student_task') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index('ix_student_task_student_updated', ['student_id', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('student_task') as batch_op:
+        batch_op.drop_index('ix_student_task_student_updated')
+        batch_op.drop_column('updated_at')
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,52 @@
+"""add attendance.updated_at and sync_tombstones
+
+Revision ID: b3e5a7c9d1f2
+Revises: a2d4f6b8c0e1
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e5a7c9d1f2'
+down_revision: Union[str, None] = 'a2d4f6b8c0e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE attendance SET updated_at = CURRENT_TIMESTAMP")
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index('ix_attendance_grade_updated', ['grade', 'updated_at'], unique=False)
+
+    op.create_index('ix_tasks_teacher_updated', 'tasks', ['teacher_id', 'updated_at'], unique=False)
+
+    op.create_table('sync_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=True),
+    sa.Column('teacher_id', sa.Integer(), nullable=True),
+    sa.Column('grade', sa.String(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sync_tombstones_id'), 'sync_tombstones', ['id'], unique=False)
+    op.create_index('ix_sync_tombstones_deleted_at', 'sync_tombstones', ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sync_tombstones_deleted_at', table_name='sync_tombstones')
+    op.drop_index(op.f('ix_sync_tombstones_id'), table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+    op.drop_index('ix_tasks_teacher_updated', table_name='tasks')
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.drop_index('ix_attendance_grade_updated')
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,65 @@
+"""add composite indexes and uniqueness for hot query paths
+
+Revision ID: b7e1c2d4a5f6
+Revises: 9d2033e537ca
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e1c2d4a5f6'
+down_revision: Union[str, None] = '9d2033e537ca'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # Перед уникальными индексами убираем дубликаты. Из назначений оставляем самое
+    # «продвинутое» (проверенное > отклонённое > сданное > назначенное), при равенстве —
+    # последнее: иначе пустое повторное назначение вытеснило бы оценку
+    dropped_tasks = bind.execute(sa.text(
+        "DELETE FROM student_task WHERE id IN ("
+        " SELECT id FROM ("
+        "  SELECT id, ROW_NUMBER() OVER ("
+        "   PARTITION BY task_id, student_id"
+        "   ORDER BY CASE COALESCE(status, 'assigned')"
+        "    WHEN 'accepted' THEN 0 WHEN 'rejected' THEN 1"
+        "    WHEN 'submitted' THEN 2 ELSE 3 END, id DESC"
+        "  ) AS rn FROM student_task"
+        " ) ranked WHERE rn > 1"
+        ")"
+    )).rowcount
+    dropped_attendance = bind.execute(sa.text(
+        "DELETE FROM attendance WHERE id NOT IN ("
+        " SELECT MAX(id) FROM attendance GROUP BY student_id, date, grade"
+        ")"
+    )).rowcount
+    if dropped_tasks or dropped_attendance:
+        logger.warning(
+            f"Удалены дубликаты: student_task — {dropped_tasks}, attendance — {dropped_attendance}"
+        )
+
+    op.create_index('uq_student_task_task_student', 'student_task', ['task_id', 'student_id'], unique=True)
+    op.create_index('ix_student_task_student_status', 'student_task', ['student_id', 'status'], unique=False)
+    op.create_index('ix_tasks_grade_teacher', 'tasks', ['grade', 'teacher_id'], unique=False)
+    op.create_index('ix_users_role_grade', 'users', ['role', 'grade'], unique=False)
+    op.create_index('ix_attendance_grade_quarter', 'attendance', ['grade', 'quarter'], unique=False)
+    op.create_index('uq_attendance_student_date_grade', 'attendance', ['student_id', 'date', 'grade'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_attendance_student_date_grade', table_name='attendance')
+    op.drop_index('ix_attendance_grade_quarter', table_name='attendance')
+    op.drop_index('ix_users_role_grade', table_name='users')
+    op.drop_index('ix_tasks_grade_teacher', table_name='tasks')
+    op.drop_index('ix_student_task_student_status', table_name='student_task')
+    op.drop_index('uq_student_task_task_student', table_name='student_task')
@@ -0,0 +1,61 @@
+"""add task_files table as an index of task attachments
+
+Revision ID: c3a9f0e1d2b4
+Revises: b7e1c2d4a5f6
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from pathlib import Path
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a9f0e1d2b4'
+down_revision: Union[str, None] = 'b7e1c2d4a5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Тот же путь, что и UPLOAD_DIR в app/api/tasks.py
+UPLOAD_DIR = Path("uploads/tasks")
+
+
+def upgrade() -> None:
+    task_files = op.create_table('task_files',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('original_name', sa.String(), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('path', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_task_files_id'), 'task_files', ['id'], unique=False)
+    op.create_index(op.f('ix_task_files_task_id'), 'task_files', ['task_id'], unique=False)
+
+    # Переносим уже загруженные файлы в индекс (исходные имена не сохранялись)
+    if not UPLOAD_DIR.exists():
+        return
+    task_ids = {row[0] for row in op.get_bind().execute(sa.text("SELECT id FROM tasks"))}
+    rows = []
+    for task_dir in sorted(UPLOAD_DIR.iterdir()):
+        if not task_dir.is_dir() or not task_dir.name.isdigit() or int(task_dir.name) not in task_ids:
+            continue
+        for f in sorted(task_dir.iterdir()):
+            if f.is_file():
+                rows.append({
+                    "task_id": int(task_dir.name),
+                    "original_name": f.name,
+                    "filename": f.name,
+                    "path": str(f),
+                })
+    if rows:
+        op.bulk_insert(task_files, rows)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_task_files_task_id'), table_name='task_files')
+    op.drop_index(op.f('ix_task_files_id'), table_name='task_files')
+    op.drop_table('task_files')
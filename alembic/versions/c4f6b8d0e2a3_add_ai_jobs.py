@@ -0,0 +1,43 @@
+"""add ai_jobs queue
+
+Revision ID: c4f6b8d0e2a3
+Revises: b3e5a7c9d1f2
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f6b8d0e2a3'
+down_revision: Union[str, None] = 'b3e5a7c9d1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ai_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('student_task_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_run_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['student_task_id'], ['student_task.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('student_task_id')
+    )
+    op.create_index(op.f('ix_ai_jobs_id'), 'ai_jobs', ['id'], unique=False)
+    op.create_index('ix_ai_jobs_status_next_run', 'ai_jobs', ['status', 'next_run_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ai_jobs_status_next_run', table_name='ai_jobs')
+    op.drop_index(op.f('ix_ai_jobs_id'), table_name='ai_jobs')
+    op.drop_table('ai_jobs')
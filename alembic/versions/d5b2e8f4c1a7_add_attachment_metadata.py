@@ -0,0 +1,107 @@
+"""add attachment metadata and submission files to task_files
+
+Revision ID: d5b2e8f4c1a7
+Revises: c3a9f0e1d2b4
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import hashlib
+import mimetypes
+from pathlib import Path
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b2e8f4c1a7'
+down_revision: Union[str, None] = 'c3a9f0e1d2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Те же пути, что и в app/api/tasks.py
+SUBMISSION_UPLOAD_DIR = Path("uploads/submissions")
+
+
+def _describe(path: Path) -> dict:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return {
+        "size": path.stat().st_size,
+        "content_type": mimetypes.guess_type(path.name)[0],
+        "sha256": sha256.hexdigest(),
+    }
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('task_files') as batch_op:
+        batch_op.add_column(sa.Column('student_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('size', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('content_type', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('sha256', sa.String(length=64), nullable=True))
+        batch_op.create_foreign_key('fk_task_files_student_id_users', 'users', ['student_id'], ['id'])
+        batch_op.create_index('ix_task_files_task_student', ['task_id', 'student_id'], unique=False)
+
+    bind = op.get_bind()
+    task_files = sa.table(
+        'task_files',
+        sa.column('id', sa.Integer),
+        sa.column('task_id', sa.Integer),
+        sa.column('student_id', sa.Integer),
+        sa.column('original_name', sa.String),
+        sa.column('filename', sa.String),
+        sa.column('path', sa.String),
+        sa.column('size', sa.BigInteger),
+        sa.column('content_type', sa.String),
+        sa.column('sha256', sa.String),
+    )
+
+    # Метаданные для уже проиндексированных файлов заданий
+    for file_id, path in bind.execute(sa.select(task_files.c.id, task_files.c.path)).all():
+        if Path(path).is_file():
+            bind.execute(
+                task_files.update().where(task_files.c.id == file_id).values(**_describe(Path(path)))
+            )
+
+    # Переносим присланные файлы учеников: uploads/submissions/<task_id>/<student_id>/
+    if not SUBMISSION_UPLOAD_DIR.exists():
+        return
+    pairs = {
+        (task_id, student_id)
+        for task_id, student_id in bind.execute(sa.text("SELECT task_id, student_id FROM student_task"))
+    }
+    rows = []
+    for task_dir in sorted(SUBMISSION_UPLOAD_DIR.iterdir()):
+        if not task_dir.is_dir() or not task_dir.name.isdigit():
+            continue
+        for student_dir in sorted(task_dir.iterdir()):
+            if not student_dir.is_dir() or not student_dir.name.isdigit():
+                continue
+            if (int(task_dir.name), int(student_dir.name)) not in pairs:
+                continue
+            for f in sorted(student_dir.iterdir()):
+                if f.is_file():
+                    rows.append({
+                        "task_id": int(task_dir.name),
+                        "student_id": int(student_dir.name),
+                        "original_name": f.name,
+                        "filename": f.name,
+                        "path": str(f),
+                        **_describe(f),
+                    })
+    if rows:
+        op.bulk_insert(task_files, rows)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM task_files WHERE student_id IS NOT NULL")
+    with op.batch_alter_table('task_files') as batch_op:
+        batch_op.drop_index('ix_task_files_task_student')
+        batch_op.drop_constraint('fk_task_files_student_id_users', type_='foreignkey')
+        batch_op.drop_column('sha256')
+        batch_op.drop_column('content_type')
+        batch_op.drop_column('size')
+        batch_op.drop_column('student_id')
@@ -0,0 +1,68 @@
+"""add student_subject_summary and student_task.graded_at
+
+Revision ID: e8c4a1b9d3f2
+Revises: d5b2e8f4c1a7
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c4a1b9d3f2'
+down_revision: Union[str, None] = 'd5b2e8f4c1a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('student_task', sa.Column('graded_at', sa.DateTime(), nullable=True))
+
+    op.create_table('student_subject_summary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('assigned_count', sa.Integer(), nullable=False),
+    sa.Column('submitted_count', sa.Integer(), nullable=False),
+    sa.Column('accepted_count', sa.Integer(), nullable=False),
+    sa.Column('rejected_count', sa.Integer(), nullable=False),
+    sa.Column('grade_sum', sa.Integer(), nullable=False),
+    sa.Column('grade_count', sa.Integer(), nullable=False),
+    sa.Column('last_grade_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['student_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_student_subject_summary_id'), 'student_subject_summary', ['id'], unique=False)
+    op.create_index('uq_student_subject_summary', 'student_subject_summary', ['student_id', 'subject'], unique=True)
+
+    # Первичное заполнение (то же, что python -m app.crud.grade_summary)
+    op.execute("""
+        INSERT INTO student_subject_summary (
+            student_id, subject, assigned_count, submitted_count, accepted_count,
+            rejected_count, grade_sum, grade_count, last_grade_at
+        )
+        SELECT
+            st.student_id,
+            t.subject,
+            SUM(CASE WHEN COALESCE(st.status, 'assigned') = 'assigned' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN st.status = 'submitted' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN st.status = 'accepted' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN st.status = 'rejected' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN st.status = 'accepted' THEN COALESCE(st.grade, 0) ELSE 0 END),
+            SUM(CASE WHEN st.status = 'accepted' AND st.grade IS NOT NULL THEN 1 ELSE 0 END),
+            MAX(CASE WHEN st.status = 'accepted' THEN st.submitted_at END)
+        FROM student_task st
+        JOIN tasks t ON t.id = st.task_id
+        WHERE st.student_id IS NOT NULL
+        GROUP BY st.student_id, t.subject
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_student_subject_summary', table_name='student_subject_summary')
+    op.drop_index(op.f('ix_student_subject_summary_id'), table_name='student_subject_summary')
+    op.drop_table('student_subject_summary')
+    op.drop_column('student_task', 'graded_at')
@@ -0,0 +1,83 @@
+"""add file_blobs: content-addressed storage for attachments
+
+Revision ID: f1a7c3e5b9d0
+Revises: e8c4a1b9d3f2
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+import hashlib
+import os
+import shutil
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a7c3e5b9d0'
+down_revision: Union[str, None] = 'e8c4a1b9d3f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BLOB_DIR = Path(settings.UPLOAD_BLOB_DIR)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def upgrade() -> None:
+    file_blobs = op.create_table('file_blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('released_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+
+    # Переносим уже загруженные файлы в хранилище; дубликаты схлопываются в один blob
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, path, sha256 FROM task_files")).fetchall()
+    refs = Counter()
+    blobs = {}
+    for file_id, path, sha256 in rows:
+        src = Path(path)
+        if not src.is_file():
+            continue
+        sha256 = sha256 or _sha256(src)
+        dst = BLOB_DIR / sha256[:2] / sha256
+        if src != dst:
+            if dst.exists():
+                src.unlink()
+            else:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(src), str(dst))
+        blobs[sha256] = {"sha256": sha256, "size": os.path.getsize(dst), "path": str(dst)}
+        refs[sha256] += 1
+        bind.execute(
+            sa.text("UPDATE task_files SET path = :path, sha256 = :sha256, size = :size WHERE id = :id"),
+            {"path": str(dst), "sha256": sha256, "size": blobs[sha256]["size"], "id": file_id},
+        )
+    if blobs:
+        now = datetime.utcnow()
+        op.bulk_insert(file_blobs, [
+            {**blob, "ref_count": refs[sha256], "created_at": now}
+            for sha256, blob in blobs.items()
+        ])
+
+
+def downgrade() -> None:
+    # Файлы остаются в uploads/blobs, task_files.path продолжает на них указывать
+    op.drop_table('file_blobs')
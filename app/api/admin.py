@@ -5,10 +5,19 @@ from typing import List
 from pydantic import BaseModel
 from typing import Optional
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_current_principal
 from app.db.models.user import User
 from app.schemas.user import UserOut
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_pooled
+from app.core.user_cache import invalidate_user
+from app.crud.gradebook import invalidate_gradebook
+from app.db.models.grade_summary import StudentSubjectSummary
+from app.db.models.task_file import TaskFile
+from app.crud import task_file as crud_task_file
+from app.crud.sync import record_attendance_deletion, record_unassignments
+from app.db.models.attendance import Attendance
+from app.db.models.student_task import StudentTask
+from app.db.models.task import Task as TaskModel
 
 router = APIRouter()
 
@@ -37,7 +46,7 @@ VALID_GRADES = {
 @router.get("/teachers", response_model=List[UserOut])
 def get_teachers(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Только для администраторов")
@@ -50,7 +59,7 @@ def get_teachers(
 def approve_teacher(
     teacher_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Только для администраторов")
@@ -67,8 +76,10 @@ def approve_teacher(
         raise HTTPException(status_code=400, detail="Учитель уже подтверждён")
 
     teacher.is_verified = True
+    teacher.token_version += 1
     db.commit()
     db.refresh(teacher)
+    invalidate_user(teacher.email, teacher.id)
     return teacher
 
 
@@ -76,7 +87,7 @@ def approve_teacher(
 def get_students_by_grade(
     grade: str,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user)
+    current_user=Depends(get_current_principal)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Только для администраторов")
@@ -101,7 +112,7 @@ def update_student(
     student_id: int,
     student_update: StudentUpdate,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user)
+    current_user=Depends(get_current_principal)
 ):
     print(f"🎯 Получен запрос на обновление ученика ID={student_id}")
     print(f"   Данные: {student_update.dict()}")
@@ -123,17 +134,23 @@ def update_student(
     print(f"   Новый класс: {student_update.grade}")
     print(f"   Пароль задан: {bool(student_update.password)}")
 
+    old_grade = student.grade
     try:
         # Обновляем данные
         student.full_name = student_update.full_name
         student.grade = student_update.grade
         if student_update.password:
-            student.hashed_password = get_password_hash(student_update.password)
+            student.hashed_password = get_password_hash_pooled(student_update.password)
             print("   🔑 Пароль обновлён")
+        if student_update.password or student.grade != old_grade:
+            student.token_version += 1  # старые токены несут прежний класс
 
         print("💾 Выполняю commit...")
         db.commit()
         db.refresh(student)
+        invalidate_user(student.email, student.id)
+        invalidate_gradebook(old_grade)
+        invalidate_gradebook(student.grade)
         print("✅ Изменения успешно сохранены в БД")
     except Exception as e:
         print(f"💥 Ошибка при сохранении: {str(e)}")
@@ -147,7 +164,7 @@ def update_student(
 def delete_student(
     student_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user)
+    current_user=Depends(get_current_principal)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Только для администраторов")
@@ -156,6 +173,27 @@ def delete_student(
     if not student:
         raise HTTPException(status_code=404, detail="Ученик не найден")
 
+    email, grade, user_id = student.email, student.grade, student.id
+    db.query(StudentSubjectSummary).filter(StudentSubjectSummary.student_id == student.id).delete()
+    crud_task_file.delete_files(db, TaskFile.student_id == student.id)
+
+    # Работы и посещаемость удаляем явно, чтобы клиенты узнали об этом через /api/sync
+    assignments = (
+        db.query(StudentTask.id, TaskModel)
+        .join(TaskModel, TaskModel.id == StudentTask.task_id)
+        .filter(StudentTask.student_id == student.id)
+        .all()
+    )
+    for st_id, task in assignments:
+        record_unassignments(db, task, [(st_id, student.id)])
+    db.query(StudentTask).filter(StudentTask.student_id == student.id).delete(synchronize_session=False)
+
+    records = db.query(Attendance.id, Attendance.grade).filter(Attendance.student_id == student.id).all()
+    record_attendance_deletion(db, records)
+    db.query(Attendance).filter(Attendance.student_id == student.id).delete(synchronize_session=False)
+
     db.delete(student)
     db.commit()
+    invalidate_user(email, user_id)
+    invalidate_gradebook(grade)
     return {"message": "Ученик удалён"}
\ No newline at end of file
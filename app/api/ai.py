@@ -2,27 +2,28 @@
 import httpx
 import logging
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.api.deps import get_db, get_current_user
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.deps import get_async_db, get_current_principal
 from app.db.models.user import User
 from app.db.models.task import Task as TaskModel
 from app.db.models.student_task import StudentTask
 from app.core.config import settings
+from app.core.http_clients import get_gen_api_client
 
 router = APIRouter()
 
 # 🔌 Конфигурация API
 API_TOKEN = settings.GEN_API_TOKEN
 API_URL = "https://api.gen-api.ru/api/v1/networks/deepseek-chat"  # ✅ Исправлено: правильный slug без пробелов
-TIMEOUT = httpx.Timeout(10.0, read=45.0)  # увеличен таймаут на чтение
 logger = logging.getLogger(__name__)
 
 
 @router.post("/analyze-submission")
 async def analyze_submission_with_ai(
     request: dict,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_principal)
 ):
     task_id = request.get("task_id")
     submission_id = request.get("submission_id")
@@ -38,17 +39,21 @@ async def analyze_submission_with_ai(
         raise HTTPException(status_code=400, detail="task_id и submission_id обязательны")
 
     # === Загрузка данных ===
-    task = db.query(TaskModel).filter(
-        TaskModel.id == task_id,
-        TaskModel.teacher_id == current_user.id
-    ).first()
+    task = (await db.execute(
+        select(TaskModel).where(
+            TaskModel.id == task_id,
+            TaskModel.teacher_id == current_user.id
+        )
+    )).scalars().first()
     if not task:
         raise HTTPException(status_code=404, detail="Задание не найдено")
 
-    student_task = db.query(StudentTask).filter(
-        StudentTask.id == submission_id,
-        StudentTask.task_id == task_id
-    ).first()
+    student_task = (await db.execute(
+        select(StudentTask).where(
+            StudentTask.id == submission_id,
+            StudentTask.task_id == task_id
+        )
+    )).scalars().first()
     if not student_task:
         raise HTTPException(status_code=404, detail="Работа не найдена")
 
@@ -89,53 +94,53 @@ async def analyze_submission_with_ai(
         "Content-Type": "application/json"
     }
 
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
+    client = get_gen_api_client()
+    try:
+        logger.info(f"📡 [ИИ] Отправка запроса к {API_URL}")
+        response = await client.post(API_URL, json=payload, headers=headers)
+        logger.info(f"📥 [ИИ] Статус ответа: {response.status_code}")
+
+        if response.status_code != 200:
+            logger.error(f"❌ [ИИ] Ошибка API: {response.status_code} — {response.text}")
+            if response.status_code == 401:
+                raise HTTPException(status_code=500, detail="Неверный токен ИИ")
+            elif response.status_code == 402:
+                raise HTTPException(status_code=402, detail="Недостаточно средств на балансе ИИ")
+            elif response.status_code == 404:
+                raise HTTPException(status_code=404, detail="Модель не найдена")
+            else:
+                raise HTTPException(status_code=502, detail="Ошибка сервиса ИИ")
+
+        # Логируем полный ответ для отладки
+        logger.debug(f"📄 [ИИ] Полный ответ: {response.text}")
+
         try:
-            logger.info(f"📡 [ИИ] Отправка запроса к {API_URL}")
-            response = await client.post(API_URL, json=payload, headers=headers)
-            logger.info(f"📥 [ИИ] Статус ответа: {response.status_code}")
-
-            if response.status_code != 200:
-                logger.error(f"❌ [ИИ] Ошибка API: {response.status_code} — {response.text}")
-                if response.status_code == 401:
-                    raise HTTPException(status_code=500, detail="Неверный токен ИИ")
-                elif response.status_code == 402:
-                    raise HTTPException(status_code=402, detail="Недостаточно средств на балансе ИИ")
-                elif response.status_code == 404:
-                    raise HTTPException(status_code=404, detail="Модель не найдена")
-                else:
-                    raise HTTPException(status_code=502, detail="Ошибка сервиса ИИ")
-
-            # Логируем полный ответ для отладки
-            logger.debug(f"📄 [ИИ] Полный ответ: {response.text}")
-
-            try:
-                result = response.json()
-            except Exception as e:
-                logger.exception(f"❌ [ИИ] Ошибка парсинга JSON: {e}")
-                raise HTTPException(status_code=502, detail="Некорректный ответ от ИИ")
-
-            # 🔑 ПРАВИЛЬНОЕ ИЗВЛЕЧЕНИЕ ТЕКСТА
-            try:
-                analysis = result["response"][0]["message"]["content"].strip()
-            except (KeyError, IndexError, TypeError):
-                logger.error(f"❌ [ИИ] Неожиданный формат ответа: {result}")
-                analysis = ""
-
-            if not analysis:
-                logger.warning("⚠️ [ИИ] Получен пустой анализ")
-                analysis = "ИИ не смог сформулировать анализ."
-
-            # Сохранение в БД
-            student_task.ai_analysis = analysis
-            db.commit()
-            logger.info(f"✅ [ИИ] Анализ сохранён: {analysis[:60]}...")
-
-            return {"analysis": analysis}
-
-        except httpx.ReadTimeout:
-            logger.error("⏱️ [ИИ] Таймаут (запрос занял >45 сек)")
-            raise HTTPException(status_code=504, detail="ИИ не ответил вовремя")
+            result = response.json()
         except Exception as e:
-            logger.exception(f"🔥 [ИИ] Непредвиденная ошибка: {e}")
-            raise HTTPException(status_code=500, detail="Внутренняя ошибка ИИ")
\ No newline at end of file
+            logger.exception(f"❌ [ИИ] Ошибка парсинга JSON: {e}")
+            raise HTTPException(status_code=502, detail="Некорректный ответ от ИИ")
+
+        # 🔑 ПРАВИЛЬНОЕ ИЗВЛЕЧЕНИЕ ТЕКСТА
+        try:
+            analysis = result["response"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError):
+            logger.error(f"❌ [ИИ] Неожиданный формат ответа: {result}")
+            analysis = ""
+
+        if not analysis:
+            logger.warning("⚠️ [ИИ] Получен пустой анализ")
+            analysis = "ИИ не смог сформулировать анализ."
+
+        # Сохранение в БД
+        student_task.ai_analysis = analysis
+        await db.commit()
+        logger.info(f"✅ [ИИ] Анализ сохранён: {analysis[:60]}...")
+
+        return {"analysis": analysis}
+
+    except httpx.ReadTimeout:
+        logger.error("⏱️ [ИИ] Таймаут (запрос занял >45 сек)")
+        raise HTTPException(status_code=504, detail="ИИ не ответил вовремя")
+    except Exception as e:
+        logger.exception(f"🔥 [ИИ] Непредвиденная ошибка: {e}")
+        raise HTTPException(status_code=500, detail="Внутренняя ошибка ИИ")
\ No newline at end of file
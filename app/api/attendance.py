@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from datetime import date
 from typing import List
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_current_principal
 from app.db.models.user import User
 from app.db.models.attendance import Attendance
 from app.schemas.attendance import AttendanceOut, AttendanceCreate
@@ -20,7 +20,7 @@ def get_attendance_for_quarter(
     grade: str,
     quarter: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только для учителей")
@@ -36,7 +36,7 @@ def update_attendance_record(
     grade: str,
     record: AttendanceCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только для учителей")
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from jose import JWTError
 
-from app.api.deps import get_db
+from app.api.deps import get_db, resolve_user
 from app.schemas.user import (
     UserCreate,
     UserLogin,
@@ -12,7 +13,7 @@ from app.schemas.user import (
     StudentGenerationResponse
 )
 from app.crud import user as crud_user
-from app.core.security import verify_password, create_access_token, decode_access_token
+from app.core.security import verify_password_async, create_access_token, decode_access_token
 
 router = APIRouter()
 
@@ -37,7 +38,7 @@ def get_current_user_from_token(
     except JWTError:
         raise credentials_exception
 
-    user = crud_user.get_user_by_email(db, email=email)
+    user = resolve_user(db, email)
     if user is None:
         raise credentials_exception
     return user
@@ -51,17 +52,18 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Роль должна быть 'teacher' или 'student'")
 
     user = crud_user.create_user(db, user_in)
-    access_token = create_access_token(data={"sub": user.email, "role": user.role})
+    access_token = create_access_token(data={"sub": user.email, "role": user.role}, user=user)
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/login")
-def login(form: UserLogin, db: Session = Depends(get_db)):
-    user = crud_user.get_user_by_email(db, form.email)
-    if not user or not verify_password(form.password, user.hashed_password):
+async def login(form: UserLogin, db: Session = Depends(get_db)):
+    # Запрос к БД — в пуле потоков, pbkdf2 — в пуле процессов: event loop свободен
+    user = await run_in_threadpool(crud_user.get_user_by_email, db, form.email)
+    if not user or not await verify_password_async(form.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Неверный email или пароль")
 
-    access_token = create_access_token(data={"sub": user.email, "role": user.role})
+    access_token = create_access_token(data={"sub": user.email, "role": user.role}, user=user)
 
     return {
         "access_token": access_token,
@@ -86,8 +88,10 @@ def generate_students_for_grade(
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Только учитель может создавать учеников")
 
-    # Генерируем 30 учеников
-    students_data = crud_user.generate_student_credentials(request.grade, count=30)
+    # Генерируем учеников сразу для всех запрошенных классов
+    students_data = []
+    for grade in request.all_grades():
+        students_data.extend(crud_user.generate_student_credentials(grade, count=request.count))
     created = crud_user.create_students_bulk(db, students_data)
 
     return {"students": created}
\ No newline at end of file
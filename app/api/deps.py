@@ -1,36 +1,123 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, get_async_db
 from app.core.config import settings
+from app.core.user_cache import CurrentUser, token_version_cache, user_cache
 from app.crud import user as crud_user
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def decode_token_payload(token: str, scope: Optional[str] = None) -> dict:
+    """scope: None — основной токен доступа, "sse" — токен потока событий; чужой scope отклоняется"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
+    if payload.get("sub") is None or payload.get("scope") != scope:
+        raise credentials_exception
+    return payload
+
+
+def resolve_user(db: Session, email: str) -> CurrentUser | None:
+    """Пользователь по subject: сначала кэш, потом БД"""
+    cached = user_cache.get(email)
+    if cached is not None:
+        return cached
 
     user = crud_user.get_user_by_email(db, email=email)
+    if user is None:
+        return None
+    snapshot = CurrentUser.from_model(user)
+    user_cache.put(email, snapshot)
+    return snapshot
+
+
+def current_token_version(db: Session, user_id: int) -> Optional[int]:
+    """users.token_version: сначала кэш, потом БД; None — пользователь удалён"""
+    version = token_version_cache.get(user_id)
+    if version is None:
+        version = crud_user.get_token_version(db, user_id)
+        if version is not None:
+            token_version_cache.put(user_id, version)
+    return version
+
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    payload = decode_token_payload(token)
+    user = resolve_user(db, payload["sub"])
     if user is None:
         raise credentials_exception
     return user
 
-def require_teacher(current_user = Depends(get_current_user)):
+
+def get_current_principal(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    Быстрый путь для проверок ролей: если в токене есть id/role/grade,
+    пользователь собирается из claims; из БД (через кэш) читается только
+    token_version — отозванный или устаревший токен отклоняется.
+    Старые токены без claims обрабатываются как в get_current_user.
+    """
+    return principal_from_token(db, token)
+
+
+def get_stream_principal(
+    db: Session = Depends(get_db),
+    header_token: Optional[str] = Depends(oauth2_scheme_optional),
+    token: Optional[str] = Query(default=None)
+):
+    """
+    Для SSE: браузерный EventSource не передаёт Authorization, поэтому токен можно
+    передать в ?token= — но только короткий SSE-токен (POST /api/events/token),
+    не основной: query string попадает в логи доступа.
+    """
+    if header_token:
+        return principal_from_token(db, header_token)
+    if not token:
+        raise credentials_exception
+    payload = decode_token_payload(token, scope="sse")
+    user = resolve_user(db, payload["sub"])
+    if user is None:
+        raise credentials_exception
+    return user
+
+
+def principal_from_token(db: Session, token: str):
+    payload = decode_token_payload(token)
+    if settings.AUTH_TOKEN_CLAIMS and "uid" in payload and "role" in payload and "tv" in payload:
+        if payload["tv"] != current_token_version(db, payload["uid"]):
+            raise credentials_exception
+        return CurrentUser(
+            id=payload["uid"],
+            email=payload["sub"],
+            role=payload["role"],
+            grade=payload.get("grade"),
+        )
+
+    user = resolve_user(db, payload["sub"])
+    if user is None:
+        raise credentials_exception
+    return user
+
+
+def require_teacher(current_user = Depends(get_current_principal)):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только для учителей")
-    return current_user
\ No newline at end of file
+    return current_user
@@ -0,0 +1,54 @@
+# app/api/events.py
+import asyncio
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import get_current_principal, get_stream_principal
+from app.core.config import settings
+from app.core.events import CLOSE, broker, format_sse
+from app.core.security import create_stream_token
+
+router = APIRouter()
+
+
+@router.post("/token")
+def stream_token(current_user=Depends(get_current_principal)):
+    """Токен для ?token= в /api/events; проверяется при подключении, поэтому
+    при переподключении EventSource клиент запрашивает новый"""
+    return {"token": create_stream_token(current_user), "expires_in": settings.SSE_TOKEN_TTL_SECONDS}
+
+
+@router.get("")
+async def events(request: Request, current_user=Depends(get_stream_principal)):
+    """
+    Поток событий пользователя (text/event-stream):
+    submission — ученик сдал работу (учителю), graded — работа проверена (ученику),
+    ai_analysis — готов ИИ-анализ (учителю).
+    EventSource не умеет слать заголовки, поэтому можно передать в ?token=
+    короткий токен из POST /api/events/token (основной токен там не принимается).
+    """
+    queue = broker.subscribe(current_user.id)
+
+    async def stream():
+        try:
+            yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=settings.SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if message is CLOSE:
+                    break
+                yield format_sse(message)
+        finally:
+            broker.unsubscribe(current_user.id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,7 +1,10 @@
 # app/api/students.py
-import uuid
-from fastapi import APIRouter, Depends, HTTPException, Path, Form, File, UploadFile
-from sqlalchemy.orm import Session
+import hashlib
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, HTTPException, Path, Form, File, UploadFile, Request, Response
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased, joinedload
 from typing import List, Optional
 from pathlib import Path as SysPath
 from datetime import datetime
@@ -9,14 +12,22 @@ import logging
 import httpx
 logger = logging.getLogger(__name__)
 # Исправлена опечатка: deps (не deeps!)
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_async_db, get_current_principal
 from app.crud.user import get_students_by_grade
 from app.schemas.user import UserOut
 from app.db.models.user import User
 from app.db.models.task import Task as TaskModel
 from app.db.models.student_task import StudentTask
-from app.core.ai_service import analyze_and_save_ai
-import asyncio
+from app.db.models.task_file import TaskFile
+from app.core.ai_worker import ai_worker
+from app.crud.ai_job import enqueue_ai_job
+from app.crud import task_file as crud_task_file
+from app.crud.gradebook import invalidate_gradebook
+from app.crud.grade_summary import refresh_summaries
+from app.core.pagination import keyset_page, cached_count, cursor_page_response
+from app.core.uploads import UploadBatch
+from app.core.downloads import etag_matches
+from app.core.events import broker
 
 router = APIRouter()
 
@@ -26,12 +37,15 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 SUBMISSION_UPLOAD_DIR = SysPath("uploads/submissions")
 SUBMISSION_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Разделитель в агрегированных списках файлов: в безопасных именах его быть не может
+FILE_LIST_SEPARATOR = "/"
+
 
 @router.get("/{grade}", response_model=List[UserOut])
 def get_students_by_grade(
     grade: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только для учителей")
@@ -46,47 +60,108 @@ def get_students_by_grade(
     return students  # может быть пустым списком []
 
 
+def _feed_etag(db: Session, student_id: int, params: tuple) -> str:
+    """
+    Версия ленты ученика: число заданий и последние updated_at.
+    Один агрегат по индексу (student_id, updated_at) — дешевле самой ленты.
+    """
+    state = (
+        db.query(func.count(StudentTask.id), func.max(StudentTask.updated_at), func.max(TaskModel.updated_at))
+        .join(TaskModel, TaskModel.id == StudentTask.task_id)
+        .filter(StudentTask.student_id == student_id)
+        .one()
+    )
+    digest = hashlib.sha1(repr((tuple(state), params)).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _file_list(value: Optional[str]) -> List[str]:
+    return value.split(FILE_LIST_SEPARATOR) if value else []
+
+
 @router.get("/tasks/new")
 def get_student_tasks_new(
+    request: Request,
+    response: Response,
     page: int = 1,
     size: int = 5,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    updated_since: Optional[datetime] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Только для учеников")
 
-    total = db.query(StudentTask).filter(
-        StudentTask.student_id == current_user.id
-    ).count()
-
-    student_tasks = (
-        db.query(StudentTask)
+    # Опрос без изменений — 304 после одного агрегатного запроса
+    etag = _feed_etag(db, current_user.id, (page, size, cursor, with_total, updated_since))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    # Лента одним запросом: задание, имя учителя и списки файлов (коррелированные подзапросы)
+    Teacher = aliased(User)
+    task_files = (
+        select(func.aggregate_strings(TaskFile.filename, FILE_LIST_SEPARATOR))
+        .where(TaskFile.task_id == TaskModel.id, TaskFile.student_id.is_(None))
+        .correlate(TaskModel)
+        .scalar_subquery()
+    )
+    student_files = (
+        select(func.aggregate_strings(TaskFile.filename, FILE_LIST_SEPARATOR))
+        .where(TaskFile.task_id == StudentTask.task_id, TaskFile.student_id == StudentTask.student_id)
+        .correlate(StudentTask)
+        .scalar_subquery()
+    )
+    query = (
+        db.query(
+            StudentTask,
+            TaskModel,
+            Teacher.full_name.label("teacher_name"),
+            task_files.label("task_files"),
+            student_files.label("student_files"),
+        )
+        .join(TaskModel, TaskModel.id == StudentTask.task_id)
+        .outerjoin(Teacher, Teacher.id == TaskModel.teacher_id)
         .filter(StudentTask.student_id == current_user.id)
-        .order_by(StudentTask.id.desc())
-        .offset((page - 1) * size)
-        .limit(size)
-        .all()
     )
+    if updated_since is not None:
+        query = query.filter(or_(
+            StudentTask.updated_at > updated_since,
+            TaskModel.updated_at > updated_since,
+        ))
+
+    if cursor is not None:
+        # Курсорный режим: пустой cursor — первая страница
+        rows, next_cursor = keyset_page(
+            query, StudentTask.id, cursor, size, get_id=lambda row: row.StudentTask.id
+        )
+        total = (
+            cached_count(("student_tasks", current_user.id, updated_since), query)
+            if with_total else None
+        )
+    else:
+        # Общее число — оконной функцией в том же запросе
+        rows = (
+            query.add_columns(func.count().over().label("total"))
+            .order_by(StudentTask.id.desc())
+            .offset((page - 1) * size)
+            .limit(size)
+            .all()
+        )
+        if rows:
+            total = rows[0].total
+        else:
+            total = query.count() if page > 1 else 0
 
     result = []
-    for st in student_tasks:
-        task = st.task
-        if not task:
-            continue
-
-        teacher = db.query(User.full_name).filter(User.id == task.teacher_id).first()
-        teacher_name = teacher[0] if teacher else "—"
-
-        task_files = []
-        task_dir = UPLOAD_DIR / str(task.id)
-        if task_dir.exists():
-            task_files = [f.name for f in task_dir.iterdir() if f.is_file()]
-
-        student_files = []
-        submission_dir = SUBMISSION_UPLOAD_DIR / str(task.id) / str(current_user.id)
-        if submission_dir.exists():
-            student_files = [f.name for f in submission_dir.iterdir() if f.is_file()]
+    for row in rows:
+        st, task = row.StudentTask, row.Task
+        task_files = _file_list(row.task_files)
+        student_files = _file_list(row.student_files)
+        teacher_name = row.teacher_name or "—"
 
         result.append({
             "id": task.id,
@@ -106,6 +181,8 @@ def get_student_tasks_new(
             "student_files": student_files,
         })
 
+    if cursor is not None:
+        return cursor_page_response(result, next_cursor, size, total)
     return {
         "items": result,
         "total": total,
@@ -120,112 +197,71 @@ async def submit_task(
     task_id: int,
     comment: Optional[str] = Form(default=None),
     files: List[UploadFile] = File(default_factory=list),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Только для учеников")
 
-    student_task = db.query(StudentTask).filter(
-        StudentTask.task_id == task_id,
-        StudentTask.student_id == current_user.id
-    ).first()
-
-    if not student_task:
-        raise HTTPException(status_code=404, detail="Задание не найдено")
-
-    student_task.is_submitted = True
-    student_task.submitted_at = datetime.utcnow()
-    student_task.comment = comment
-    student_task.status = "submitted"
-    student_task.teacher_comment = None
-
-    if files:
-        task_dir = SUBMISSION_UPLOAD_DIR / str(task_id) / str(current_user.id)
-        task_dir.mkdir(parents=True, exist_ok=True)
-        for file in files:
-            if file.filename:
-                ext = file.filename.split('.')[-1] if '.' in file.filename else ''
-                safe_name = f"{uuid.uuid4().hex}.{ext}" if ext else uuid.uuid4().hex
-                content = await file.read()
-                with open(task_dir / safe_name, "wb") as f:
-                    f.write(content)
-
-    db.commit()
-    if student_task.task.enable_ai_analysis:
-        from app.db.session import SessionLocal
-        bg_db = SessionLocal()
-        asyncio.create_task(
-            analyze_and_save_ai(
-                db=bg_db,
-                student_task_id=student_task.id,
-                teacher_task=student_task.task.description,
-                student_answer=student_task.comment or ""
-            )
+    result = await db.execute(
+        select(StudentTask)
+        # student — для имени в событии: при AUTH_TOKEN_CLAIMS current_user без full_name
+        .options(joinedload(StudentTask.task), joinedload(StudentTask.student))
+        .where(
+            StudentTask.task_id == task_id,
+            StudentTask.student_id == current_user.id
         )
-    return {"status": "submitted", "message": "Задание отправлено на проверку"}
-
-@router.post("/tasks/{task_id}/submit")
-async def submit_task(
-        task_id: int,
-        comment: Optional[str] = Form(default=None),
-        files: List[UploadFile] = File(default_factory=list),
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
-):
-    if current_user.role != "student":
-        raise HTTPException(status_code=403, detail="Только для учеников")
-
-    student_task = db.query(StudentTask).filter(
-        StudentTask.task_id == task_id,
-        StudentTask.student_id == current_user.id
-    ).first()
+    )
+    student_task = result.scalars().first()
 
     if not student_task:
         raise HTTPException(status_code=404, detail="Задание не найдено")
 
     # Сохраняем отправку
-    student_task.is_submitted = True
     student_task.submitted_at = datetime.utcnow()
     student_task.comment = comment
     student_task.status = "submitted"
     student_task.teacher_comment = None
 
     # Загружаем файлы
-    if files:
-        task_dir = SUBMISSION_UPLOAD_DIR / str(task_id) / str(current_user.id)
-        task_dir.mkdir(parents=True, exist_ok=True)
+    # Файлы пишутся по частям в хранилище по SHA-256, не блокируя event loop; при ошибке — откат
+    batch = UploadBatch()
+    try:
         for file in files:
             if file.filename:
-                ext = file.filename.split('.')[-1] if '.' in file.filename else ''
-                safe_name = f"{uuid.uuid4().hex}.{ext}" if ext else uuid.uuid4().hex
-                content = await file.read()
-                with open(task_dir / safe_name, "wb") as f:
-                    f.write(content)
-
-    db.commit()
-
-    # После db.commit() в submit_task
+                stored = await batch.save(file)
+                crud_task_file.add_task_file(
+                    db, task_id=task_id, student_id=current_user.id, **asdict(stored)
+                )
+
+        summary_pairs = [(current_user.id, student_task.task.subject)]
+
+        enqueue_ai = student_task.task.enable_ai_analysis
+
+        def _sync_updates(session):
+            batch.claim(session)
+            refresh_summaries(session, summary_pairs)
+            # Задача ИИ пишется в той же транзакции — не потеряется при перезапуске
+            if enqueue_ai:
+                enqueue_ai_job(session, student_task.id)
+
+        await db.run_sync(_sync_updates)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        await db.run_sync(batch.rollback)
+        raise
+    invalidate_gradebook(student_task.task.grade)
+    broker.publish([student_task.task.teacher_id], "submission", {
+        "submission_id": student_task.id,
+        "task_id": task_id,
+        "student_id": current_user.id,
+        "student_name": student_task.student.full_name,
+        "grade": student_task.task.grade,
+    })
 
     # === ВЫЗОВ ИИ, ЕСЛИ ВКЛЮЧЁН ===
-    if student_task.task.enable_ai_analysis:
-        logger.info(f"🚀 [Students] Запуск ИИ в фоне для submission_id={student_task.id}")
-
-        # Создаём новую сессию БД для фоновой задачи
-        from app.db.session import SessionLocal  # ← убедитесь, что у вас есть такой файл
-        bg_db = SessionLocal()
-
-        # Запускаем без await → не блокирует ответ
-        asyncio.create_task(
-            analyze_and_save_ai(
-                db=bg_db,
-                student_task_id=student_task.id,
-                teacher_task=student_task.task.description,
-                student_answer=student_task.comment or ""
-            )
-        )
+    if enqueue_ai:
+        logger.info(f"🚀 [Students] ИИ-анализ поставлен в очередь для submission_id={student_task.id}")
+        ai_worker.wake()
     return {"status": "submitted", "message": "Задание отправлено на проверку"}
-
-
-
-
@@ -0,0 +1,25 @@
+# app/api/sync.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_db, get_current_principal
+from app.crud.sync import decode_sync_token, get_changes
+
+router = APIRouter()
+
+
+@router.get("")
+def sync(
+    since: Optional[str] = None,
+    grade: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_principal)
+):
+    """
+    Только изменения с прошлой синхронизации. Без since (или с устаревшим токеном)
+    приходит полная выгрузка с reset = true; token из ответа передаётся в следующий запрос.
+    """
+    since_ts = decode_sync_token(since) if since else None
+    return get_changes(db, current_user, since_ts, grade)
@@ -1,24 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status, File, UploadFile, Form
+from sqlalchemy import update
+from sqlalchemy.orm import Session, aliased
 from typing import List, Optional
 from datetime import datetime
-import uuid
+from dataclasses import asdict
+from urllib.parse import quote
+from fastapi.responses import StreamingResponse
 from pathlib import Path
-from fastapi.responses import FileResponse
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_current_user, get_current_principal
 from app.db.models.user import User
 from app.db.models.task import Task as TaskModel
 from app.db.models.student_task import StudentTask
+from app.db.models.task_file import TaskFile
 
 from app.schemas.task import (
     Task,
     TaskCreateRequest,
     TaskUpdateRequest,
-    TaskWithSubmissionStatus
+    TaskWithSubmissionStatus,
+    SubmissionBulkRequest
 )
 from app.crud.task import create_task as crud_create_task
 from app.crud.task import update_task as crud_update_task
+from app.crud.task import get_student_grades as crud_get_student_grades
+from app.crud import task_file as crud_task_file
+from app.crud.sync import record_task_deletion
+from app.crud import gradebook as crud_gradebook
+from app.crud.grade_summary import refresh_summaries, get_student_summary
+from app.core.pagination import keyset_page, cached_count, cursor_page_response
+from app.core.uploads import UploadBatch
+from app.core.downloads import file_download_response
+from app.core.zipstream import stream_zip
+from app.core.storage_cleanup import enqueue_cleanup
+from app.core.events import notify_graded
 
 router = APIRouter()
 
@@ -35,7 +50,7 @@ ALLOWED_REASONS = {"homework", "illness", "not_submitted"}
 def create_task_endpoint(
     task_in: TaskCreateRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только учитель")
@@ -43,32 +58,31 @@ def create_task_endpoint(
     if task_in.reason not in ALLOWED_REASONS:
         raise HTTPException(status_code=422, detail="Недопустимое значение 'reason'")
 
-    if not task_in.student_ids:
-        raise HTTPException(status_code=400, detail="Выберите учеников")
-
-    students = []
-    grade = None
-    for student_id in task_in.student_ids:
-        student = db.query(User).filter(
-            User.id == student_id,
-            User.role == "student"
-        ).first()
-        if not student:
-            raise HTTPException(status_code=400, detail=f"Ученик {student_id} не найден")
-        students.append(student)
-        if grade is None:
-            grade = student.grade
-        elif student.grade != grade:
+    if task_in.assign_all:
+        grade = task_in.grade
+    else:
+        if not task_in.student_ids:
+            raise HTTPException(status_code=400, detail="Выберите учеников")
+
+        # Все ученики одним IN-запросом
+        student_grades = crud_get_student_grades(db, task_in.student_ids)
+        for student_id in task_in.student_ids:
+            if student_id not in student_grades:
+                raise HTTPException(status_code=400, detail=f"Ученик {student_id} не найден")
+        grades = set(student_grades.values())
+        if len(grades) > 1:
             raise HTTPException(status_code=400, detail="Ученики из разных классов")
+        grade = grades.pop()
 
-    if grade != task_in.grade:
-        raise HTTPException(status_code=400, detail="Несоответствие класса")
+        if grade != task_in.grade:
+            raise HTTPException(status_code=400, detail="Несоответствие класса")
 
     task_data = task_in.dict()
     task_data["teacher_id"] = current_user.id
     task_data["grade"] = grade
 
     db_task = crud_create_task(db, task_data)
+    crud_gradebook.invalidate_gradebook(db_task.grade)
     return db_task
 
 
@@ -77,7 +91,7 @@ def update_task_endpoint(
     task_id: int,
     task_in: TaskUpdateRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только учитель")
@@ -90,21 +104,21 @@ def update_task_endpoint(
         raise HTTPException(status_code=404, detail="Задание не найдено")
 
     grade = task.grade
-    for student_id in task_in.student_ids:
-        student = db.query(User).filter(
-            User.id == student_id,
-            User.role == "student",
-            User.grade == grade
-        ).first()
-        if not student:
-            raise HTTPException(status_code=400, detail=f"Ученик {student_id} не найден")
+    if not task_in.assign_all and task_in.student_ids is not None:
+        student_grades = crud_get_student_grades(db, task_in.student_ids)
+        for student_id in task_in.student_ids:
+            if student_grades.get(student_id) != grade:
+                raise HTTPException(status_code=400, detail=f"Ученик {student_id} не найден")
 
     task_data = task_in.dict()
+    if task_in.student_ids is None:
+        task_data.pop("student_ids")
     task_data["grade"] = grade
 
     updated_task = crud_update_task(db, task_id, task_data)
     if not updated_task:
         raise HTTPException(status_code=404, detail="Не удалось обновить задание")
+    crud_gradebook.invalidate_gradebook(updated_task.grade)
     return updated_task
 
 
@@ -114,9 +128,16 @@ def get_tasks_by_grade(
     scope: str = "mine",
     page: int = 1,
     size: int = 10,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
+    """
+    По умолчанию — постраничная выдача (page/size).
+    С параметром cursor (пустая строка — первая страница) — курсорная по id DESC:
+    в ответе next_cursor, total только при with_total=true (кэшируется).
+    """
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только учитель")
 
@@ -126,19 +147,37 @@ def get_tasks_by_grade(
     elif scope != "all":
         raise HTTPException(status_code=400, detail="scope must be 'mine' or 'all'")
 
-    total = query.count()
-    tasks = query.order_by(TaskModel.id.desc()).offset((page - 1) * size).limit(size).all()
+    # Имя учителя — через JOIN, а не отдельным запросом на каждое задание
+    page_query = query.outerjoin(User, User.id == TaskModel.teacher_id).add_columns(User.full_name)
+    if cursor is not None:
+        rows, next_cursor = keyset_page(page_query, TaskModel.id, cursor, size, get_id=lambda row: row[0].id)
+        total = cached_count(("tasks_by_grade", grade, scope, current_user.id), query) if with_total else None
+    else:
+        total = query.count()
+        rows = (
+            page_query
+            .order_by(TaskModel.id.desc())
+            .offset((page - 1) * size)
+            .limit(size)
+            .all()
+        )
+    task_ids = [task.id for task, _ in rows]
+
+    # student_ids и файлы для всей страницы — по одному запросу
+    student_ids_map = {task_id: [] for task_id in task_ids}
+    if task_ids:
+        assignments = (
+            db.query(StudentTask.task_id, StudentTask.student_id)
+            .filter(StudentTask.task_id.in_(task_ids))
+            .order_by(StudentTask.id)
+            .all()
+        )
+        for task_id, student_id in assignments:
+            student_ids_map[task_id].append(student_id)
+    files_map = crud_task_file.get_task_file_names(db, task_ids)
 
     result = []
-    for task in tasks:
-        teacher = db.query(User.full_name).filter(User.id == task.teacher_id).first()
-        student_ids = [st.student_id for st in task.student_tasks]
-
-        task_files = []
-        task_dir = UPLOAD_DIR / str(task.id)
-        if task_dir.exists():
-            task_files = [f.name for f in task_dir.iterdir() if f.is_file()]
-
+    for task, teacher_name in rows:
         result.append({
             "id": task.id,
             "title": task.title,
@@ -148,12 +187,14 @@ def get_tasks_by_grade(
             "due_date": task.due_date,
             "grade": task.grade,
             "teacher_id": task.teacher_id,
-            "teacher_name": teacher[0] if teacher else "—",
-            "student_ids": student_ids,
-            "files": task_files,
+            "teacher_name": teacher_name or "—",
+            "student_ids": student_ids_map[task.id],
+            "files": files_map.get(task.id, []),
             "enable_ai_analysis": task.enable_ai_analysis
         })
 
+    if cursor is not None:
+        return cursor_page_response(result, next_cursor, size, total)
     return {
         "items": result,
         "total": total,
@@ -170,7 +211,7 @@ def upload_task_files(
     task_id: int,
     files: List[UploadFile] = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только учитель")
@@ -185,34 +226,38 @@ def upload_task_files(
     if len(files) > 5:
         raise HTTPException(status_code=400, detail="Максимум 5 файлов")
 
-    task_dir = UPLOAD_DIR / str(task_id)
-    task_dir.mkdir(exist_ok=True)
-
-    for file in files:
-        if file.filename:
-            ext = file.filename.split('.')[-1] if '.' in file.filename else ''
-            safe_name = f"{uuid.uuid4().hex}.{ext}" if ext else uuid.uuid4().hex
-            with open(task_dir / safe_name, "wb") as f:
-                f.write(file.file.read())
-
+    # Файлы пишутся по частям в хранилище по SHA-256; при превышении лимита или ошибке — откат
+    batch = UploadBatch()
+    try:
+        for file in files:
+            if file.filename:
+                stored = batch.save_sync(file)
+                crud_task_file.add_task_file(db, task_id=task_id, **asdict(stored))
+        batch.claim(db)
+        task.updated_at = datetime.utcnow()  # список файлов — часть задания для ленты ученика
+        db.commit()
+    except Exception:
+        db.rollback()
+        batch.rollback(db)
+        raise
     return {"uploaded": len(files)}
 
 
 @router.get("/{task_id}/files/{filename}")
-def download_task_file(task_id: int, filename: str):
+def download_task_file(task_id: int, filename: str, request: Request, db: Session = Depends(get_db)):
     if ".." in filename or filename.startswith("/"):
         raise HTTPException(status_code=400, detail="Недопустимое имя файла")
-    file_path = UPLOAD_DIR / str(task_id) / filename
-    if not file_path.exists():
+    task_file = crud_task_file.get_task_file(db, task_id, filename)
+    if not task_file or not Path(task_file.path).exists():
         raise HTTPException(status_code=404, detail="Файл не найден")
-    return FileResponse(file_path, filename=filename)
+    return file_download_response(request, task_file)
 
 
 @router.get("/{task_id}/files")
 def list_task_files(
     task_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только учитель")
@@ -223,8 +268,7 @@ def list_task_files(
     if not task:
         raise HTTPException(status_code=404, detail="Задание не найдено")
 
-    task_dir = UPLOAD_DIR / str(task_id)
-    files = [f.name for f in task_dir.iterdir() if f.is_file()] if task_dir.exists() else []
+    files = crud_task_file.get_task_file_names(db, [task_id]).get(task_id, [])
     return {"files": files}
 
 
@@ -233,7 +277,7 @@ def delete_task_file(
     task_id: int,
     filename: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только учитель")
@@ -246,9 +290,10 @@ def delete_task_file(
     if ".." in filename or filename.startswith("/"):
         raise HTTPException(status_code=400, detail="Недопустимое имя файла")
 
-    file_path = UPLOAD_DIR / str(task_id) / filename
-    if file_path.exists():
-        file_path.unlink()
+    # Сам blob удалит сборщик мусора, когда на него не останется ссылок
+    crud_task_file.delete_task_file(db, task_id, filename)
+    task.updated_at = datetime.utcnow()
+    db.commit()
     return {"detail": "Файл удалён"}
 
 
@@ -257,49 +302,90 @@ def delete_task_file(
 @router.get("/submissions")
 def get_submissions(
     grade: Optional[str] = None,
+    subject: Optional[str] = None,
+    task_id: Optional[int] = None,
+    submitted_from: Optional[datetime] = None,
+    submitted_to: Optional[datetime] = None,
+    page: int = 1,
+    size: int = 20,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
+    """
+    Очередь работ на проверку: сначала самые старые.
+    Задание, ученик и учитель подгружаются JOIN'ами, файлы — одним запросом на страницу.
+    """
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только для учителей")
 
-    query = db.query(StudentTask).join(TaskModel).filter(
-        StudentTask.status == "submitted",
-        TaskModel.teacher_id == current_user.id
+    Student = aliased(User)
+    Teacher = aliased(User)
+    query = (
+        db.query(StudentTask, TaskModel, Student.full_name, Teacher.full_name)
+        .join(TaskModel, TaskModel.id == StudentTask.task_id)
+        .outerjoin(Student, Student.id == StudentTask.student_id)
+        .outerjoin(Teacher, Teacher.id == TaskModel.teacher_id)
+        .filter(
+            StudentTask.status == "submitted",
+            TaskModel.teacher_id == current_user.id
+        )
     )
     if grade:
         query = query.filter(TaskModel.grade == grade)
+    if subject:
+        query = query.filter(TaskModel.subject == subject)
+    if task_id is not None:
+        query = query.filter(StudentTask.task_id == task_id)
+    if submitted_from:
+        query = query.filter(StudentTask.submitted_at >= submitted_from)
+    if submitted_to:
+        query = query.filter(StudentTask.submitted_at < submitted_to)
 
-    submissions = query.all()
-    result = []
-    for sub in submissions:
-        submission_dir = SUBMISSION_UPLOAD_DIR / str(sub.task_id) / str(sub.student_id)
-        student_files = [f.name for f in submission_dir.iterdir() if f.is_file()] if submission_dir.exists() else []
-        teacher = db.query(User.full_name).filter(User.id == sub.task.teacher_id).first()
+    total = query.count()
+    rows = (
+        query.order_by(StudentTask.submitted_at.asc(), StudentTask.id.asc())
+        .offset((page - 1) * size)
+        .limit(size)
+        .all()
+    )
+    files_map = crud_task_file.get_submission_file_names(
+        db, [(sub.task_id, sub.student_id) for sub, _, _, _ in rows]
+    )
 
+    result = []
+    for sub, task, student_name, teacher_name in rows:
         result.append({
             "id": sub.id,
             "task_id": sub.task_id,
-            "task_title": sub.task.title,
-            "description": sub.task.description,  # ← добавлено
-            "subject": sub.task.subject,  # ← добавлено
-            "teacher_name": teacher[0] if teacher else "—",  # ← добавлено
-            "task_enable_ai_analysis": sub.task.enable_ai_analysis,
-            "student_name": sub.student.full_name,
-            "grade": sub.task.grade,
+            "task_title": task.title,
+            "description": task.description,
+            "subject": task.subject,
+            "teacher_name": teacher_name or "—",
+            "task_enable_ai_analysis": task.enable_ai_analysis,
+            "student_name": student_name or "—",
+            "grade": task.grade,
             "student_comment": sub.comment,
-            "student_files": student_files,
+            "student_files": files_map.get((sub.task_id, sub.student_id), []),
             "ai_analysis": sub.ai_analysis,
+            "submitted_at": sub.submitted_at,
         })
-    return result
+
+    return {
+        "items": result,
+        "total": total,
+        "page": page,
+        "size": size,
+        "pages": max(1, (total + size - 1) // size)
+    }
 
 
 @router.get("/submissions/{submission_id}/files/{filename}")
 def download_student_file(
     submission_id: int,
     filename: str,
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только для учителей")
@@ -314,11 +400,78 @@ def download_student_file(
     if ".." in filename or filename.startswith("/"):
         raise HTTPException(status_code=400, detail="Недопустимое имя файла")
 
-    file_path = SUBMISSION_UPLOAD_DIR / str(student_task.task_id) / str(student_task.student_id) / filename
-    if not file_path.exists():
+    task_file = crud_task_file.get_task_file(
+        db, student_task.task_id, filename, student_id=student_task.student_id
+    )
+    if not task_file or not Path(task_file.path).exists():
         raise HTTPException(status_code=404, detail="Файл не найден")
 
-    return FileResponse(file_path, filename=filename, content_disposition_type="inline")
+    return file_download_response(request, task_file, disposition_type="inline")
+
+
+def _zip_folder_name(full_name: str) -> str:
+    # Ведущие точки срезаем: имя ".." не должно превращаться в переход на уровень вверх
+    return "".join("_" if ch in '/\\:*?"<>|' else ch for ch in full_name).lstrip(" .").rstrip() or "Без имени"
+
+
+def _zip_file_name(original_name: str) -> str:
+    # original_name пришло от клиента: оставляем только последний компонент пути (zip-slip)
+    return _zip_folder_name(original_name.replace("\\", "/").rsplit("/", 1)[-1])
+
+
+@router.get("/{task_id}/submissions.zip")
+def download_submissions_zip(
+    task_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_principal)
+):
+    if current_user.role != "teacher":
+        raise HTTPException(status_code=403, detail="Только для учителей")
+
+    task = db.query(TaskModel).filter(
+        TaskModel.id == task_id,
+        TaskModel.teacher_id == current_user.id
+    ).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+
+    rows = (
+        db.query(TaskFile.student_id, User.full_name, TaskFile.original_name, TaskFile.path)
+        .join(User, User.id == TaskFile.student_id)
+        .filter(TaskFile.task_id == task_id, TaskFile.student_id.isnot(None))
+        .order_by(User.full_name, TaskFile.student_id, TaskFile.id)
+        .all()
+    )
+    if not rows:
+        raise HTTPException(status_code=404, detail="Ученики ещё не прислали файлы")
+
+    # Папка на ученика; однофамильцев различаем по id, одинаковые имена файлов — по номеру
+    name_counts = {}
+    for student_id, full_name in {(r.student_id, r.full_name) for r in rows}:
+        name_counts[full_name] = name_counts.get(full_name, 0) + 1
+    entries = []
+    used = set()
+    for student_id, full_name, original_name, path in rows:
+        folder = _zip_folder_name(full_name)
+        if name_counts[full_name] > 1:
+            folder = f"{folder} ({student_id})"
+        file_name = _zip_file_name(original_name)
+        arcname = f"{folder}/{file_name}"
+        n = 1
+        while arcname in used:
+            stem, dot, ext = file_name.rpartition(".")
+            arcname = f"{folder}/{stem} ({n}).{ext}" if dot else f"{folder}/{file_name} ({n})"
+            n += 1
+        used.add(arcname)
+        if Path(path).exists():
+            entries.append((arcname, path))
+
+    archive_name = quote(f"{task.title}.zip")
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename*=utf-8''{archive_name}"},
+    )
 
 
 @router.post("/submissions/{submission_id}/accept")
@@ -327,7 +480,7 @@ def accept_submission(
     grade: int = Form(...),
     comment: Optional[str] = Form(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только для учителей")
@@ -344,7 +497,11 @@ def accept_submission(
     student_task.status = "accepted"
     student_task.grade = grade
     student_task.teacher_comment = comment
+    student_task.graded_at = datetime.utcnow()
+    refresh_summaries(db, [(student_task.student_id, student_task.task.subject)])
     db.commit()
+    crud_gradebook.invalidate_gradebook(student_task.task.grade)
+    notify_graded(student_task.student_id, student_task.id, student_task.task_id, "accepted", grade)
     return {"status": "accepted"}
 
 
@@ -353,7 +510,7 @@ def reject_submission(
     submission_id: int,
     comment: str = Form(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только для учителей")
@@ -368,58 +525,153 @@ def reject_submission(
 
     student_task.status = "rejected"
     student_task.teacher_comment = comment
+    student_task.graded_at = datetime.utcnow()
+    refresh_summaries(db, [(student_task.student_id, student_task.task.subject)])
     db.commit()
+    crud_gradebook.invalidate_gradebook(student_task.task.grade)
+    notify_graded(student_task.student_id, student_task.id, student_task.task_id, "rejected")
     return {"status": "rejected"}
 
 
+@router.post("/submissions/bulk")
+def bulk_grade_submissions(
+    request: SubmissionBulkRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_principal)
+):
+    """
+    Проверка пачки работ: одна выборка с проверкой владельца,
+    пакетные UPDATE и один коммит. Результат — по каждой позиции.
+    """
+    if current_user.role != "teacher":
+        raise HTTPException(status_code=403, detail="Только для учителей")
+
+    ids = {item.submission_id for item in request.items}
+    owned = {
+        row.id: row
+        for row in db.query(
+            StudentTask.id, StudentTask.task_id, StudentTask.student_id, TaskModel.subject, TaskModel.grade
+        )
+        .join(TaskModel, TaskModel.id == StudentTask.task_id)
+        .filter(StudentTask.id.in_(ids), TaskModel.teacher_id == current_user.id)
+    }
+
+    now = datetime.utcnow()
+    accepted, rejected, results = [], [], []
+    seen = set()
+    for item in request.items:
+        sid = item.submission_id
+        if sid in seen:
+            error = "Работа указана повторно"
+        elif sid not in owned:
+            error = "Задание не найдено"
+        elif item.action == "accept" and item.grade not in [2, 3, 4, 5]:
+            error = "Оценка должна быть от 2 до 5"
+        elif item.action == "reject" and not (item.comment or "").strip():
+            error = "Комментарий обязателен"
+        else:
+            error = None
+        seen.add(sid)
+        if error:
+            results.append({"submission_id": sid, "status": "error", "detail": error})
+            continue
+
+        if item.action == "accept":
+            accepted.append({
+                "id": sid, "status": "accepted", "grade": item.grade,
+                "teacher_comment": item.comment, "graded_at": now,
+            })
+            results.append({"submission_id": sid, "status": "accepted"})
+        else:
+            rejected.append({
+                "id": sid, "status": "rejected",
+                "teacher_comment": item.comment, "graded_at": now,
+            })
+            results.append({"submission_id": sid, "status": "rejected"})
+
+    # Пакетный UPDATE по первичному ключу (executemany)
+    if accepted:
+        db.execute(update(StudentTask), accepted)
+    if rejected:
+        db.execute(update(StudentTask), rejected)
+
+    changed = [owned[row["id"]] for row in accepted + rejected]
+    if changed:
+        refresh_summaries(db, {(row.student_id, row.subject) for row in changed})
+        db.commit()
+        for grade in {row.grade for row in changed}:
+            crud_gradebook.invalidate_gradebook(grade)
+        for row in accepted + rejected:
+            sub = owned[row["id"]]
+            notify_graded(sub.student_id, sub.id, sub.task_id, row["status"], row.get("grade"))
+
+    return {
+        "updated": len(changed),
+        "failed": len(results) - len(changed),
+        "results": results,
+    }
+
+
 @router.get("/submissions/accepted")
 def get_accepted_submissions(
     grade: Optional[str] = None,
     page: int = 1,
     size: int = 5,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только для учителей")
 
-    query = db.query(StudentTask).join(TaskModel).filter(
-        StudentTask.status == "accepted",
-        TaskModel.teacher_id == current_user.id
+    # Задание, ученик и учитель — JOIN'ами в том же запросе, файлы — одним запросом на страницу
+    Student = aliased(User)
+    Teacher = aliased(User)
+    query = (
+        db.query(StudentTask, TaskModel, Student.full_name, Teacher.full_name)
+        .join(TaskModel, TaskModel.id == StudentTask.task_id)
+        .outerjoin(Student, Student.id == StudentTask.student_id)
+        .outerjoin(Teacher, Teacher.id == TaskModel.teacher_id)
+        .filter(
+            StudentTask.status == "accepted",
+            TaskModel.teacher_id == current_user.id
+        )
     )
     if grade:
         query = query.filter(TaskModel.grade == grade)
 
-    total = query.count()
-    submissions = (
-        query.order_by(StudentTask.id.desc())
-        .offset((page - 1) * size)
-        .limit(size)
-        .all()
+    if cursor is not None:
+        rows, next_cursor = keyset_page(query, StudentTask.id, cursor, size, get_id=lambda row: row[0].id)
+        total = cached_count(("accepted_submissions", grade, current_user.id), query) if with_total else None
+    else:
+        total = query.count()
+        rows = (
+            query.order_by(StudentTask.id.desc())
+            .offset((page - 1) * size)
+            .limit(size)
+            .all()
+        )
+
+    task_files_map = crud_task_file.get_task_file_names(db, {sub.task_id for sub, _, _, _ in rows})
+    student_files_map = crud_task_file.get_submission_file_names(
+        db, [(sub.task_id, sub.student_id) for sub, _, _, _ in rows]
     )
 
     result = []
-    for sub in submissions:
-        task_files = []
-        task_dir = UPLOAD_DIR / str(sub.task_id)
-        if task_dir.exists():
-            task_files = [f.name for f in task_dir.iterdir() if f.is_file()]
-
-        student_files = []
-        submission_dir = SUBMISSION_UPLOAD_DIR / str(sub.task_id) / str(sub.student_id)
-        if submission_dir.exists():
-            student_files = [f.name for f in submission_dir.iterdir() if f.is_file()]
-        teacher = db.query(User.full_name).filter(User.id == sub.task.teacher_id).first()
+    for sub, task, student_name, teacher_name in rows:
+        task_files = task_files_map.get(sub.task_id, [])
+        student_files = student_files_map.get((sub.task_id, sub.student_id), [])
 
         result.append({
             "id": sub.id,
             "task_id": sub.task_id,
-            "task_title": sub.task.title,
-            "description": sub.task.description,  # ← добавьте
-            "subject": sub.task.subject,  # ← добавьте
-            "teacher_name": teacher[0] if teacher else "—",  # ← добавьте
-            "student_name": sub.student.full_name if sub.student else "—",
-            "grade": sub.task.grade,
+            "task_title": task.title,
+            "description": task.description,
+            "subject": task.subject,
+            "teacher_name": teacher_name or "—",
+            "student_name": student_name or "—",
+            "grade": task.grade,
             "teacher_grade": sub.grade,
             "teacher_comment": sub.teacher_comment,
             "student_comment": sub.comment,
@@ -428,6 +680,8 @@ def get_accepted_submissions(
             "task_files": task_files,
         })
 
+    if cursor is not None:
+        return cursor_page_response(result, next_cursor, size, total)
     return {
         "items": result,
         "total": total,
@@ -441,7 +695,7 @@ def get_accepted_submissions(
 def delete_task(
         task_id: int,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: User = Depends(get_current_principal)
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только учитель")
@@ -454,18 +708,24 @@ def delete_task(
     if not task:
         raise HTTPException(status_code=404, detail="Задание не найдено")
 
-    # Удаляем связанные файлы задания
-    task_dir = UPLOAD_DIR / str(task_id)
-    if task_dir.exists():
-        import shutil
-        shutil.rmtree(task_dir)
+    # Ссылки на blob'ы снимаем сразу, а каталоги удалит фоновый поток после коммита
+    crud_task_file.delete_files(db, TaskFile.task_id == task_id)
+
+    assignments = db.query(StudentTask.id, StudentTask.student_id).filter(StudentTask.task_id == task_id).all()
+    # Пары (ученик, предмет), сводку по которым нужно пересчитать
+    affected = [(student_id, task.subject) for _, student_id in assignments]
 
     # Удаляем все работы учеников
     db.query(StudentTask).filter(StudentTask.task_id == task_id).delete()
 
-    # Удаляем само задание
+    # Удаляем само задание; клиенты узнают об этом через /api/sync
+    grade = task.grade
+    record_task_deletion(db, task, assignments)
     db.delete(task)
+    refresh_summaries(db, affected)
     db.commit()
+    crud_gradebook.invalidate_gradebook(grade)
+    enqueue_cleanup(UPLOAD_DIR / str(task_id), SUBMISSION_UPLOAD_DIR / str(task_id))
 
     return {"detail": "Задание удалено"}
 
@@ -474,109 +734,48 @@ def delete_task(
 def get_grades_table(
     grade: str,
     subject: Optional[str] = None,
+    format: str = "cells",
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
+    """
+    format=cells — ячейка на каждую пару задание × ученик (как раньше);
+    format=matrix — компактные параллельные массивы только по назначенным ячейкам.
+    Журнал кэшируется и сбрасывается при сдаче, проверке и изменении заданий.
+    """
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Только для учителей")
+    if format not in ("cells", "matrix"):
+        raise HTTPException(status_code=400, detail="format must be 'cells' or 'matrix'")
 
-    # 1. Все ученики класса
-    students = db.query(User).filter(
-        User.grade == grade,
-        User.role == "student"
-    ).order_by(User.full_name).all()
+    gradebook = crud_gradebook.get_gradebook(db, grade, current_user.id, subject)
+    if format == "matrix":
+        return crud_gradebook.render_matrix(gradebook)
+    return crud_gradebook.render_cells(gradebook)
 
-    if not students:
-        return {
-            "students": [],
-            "tasks": [],
-            "cells": {}
-        }
 
-    student_ids_list = [s.id for s in students]
+GRADES_VIEWS = ("tasks", "summary")
 
-    # 2. Все задания для класса
-    task_query = db.query(TaskModel).filter(
-        TaskModel.grade == grade,
-        TaskModel.teacher_id == current_user.id
-    )
-    if subject and subject != "Все предметы":
-        task_query = task_query.filter(TaskModel.subject == subject)
-
-    tasks = task_query.order_by(TaskModel.due_date.desc()).all()
-
-    # 3. Загружаем student_ids для каждого задания
-    # Используем связь через StudentTask
-    task_student_map = {}
-    if tasks:
-        task_ids = [t.id for t in tasks]
-        student_assignments = db.query(StudentTask.task_id, StudentTask.student_id).filter(
-            StudentTask.task_id.in_(task_ids)
-        ).all()
-        for task_id, student_id in student_assignments:
-            if task_id not in task_student_map:
-                task_student_map[task_id] = set()
-            task_student_map[task_id].add(student_id)
-
-    # 4. Все работы учеников (присланные + принятые)
-    student_tasks = db.query(StudentTask).filter(
-        StudentTask.task_id.in_([t.id for t in tasks]),
-        StudentTask.student_id.in_(student_ids_list)
-    ).all()
 
-    st_map = {
-        (st.task_id, st.student_id): st
-        for st in student_tasks
-    }
+def _student_info(student: User) -> dict:
+    return {"id": student.id, "full_name": student.full_name, "grade": student.grade}
 
-    # 5. Формируем cells
-    cells = {}
-    for task in tasks:
-        assigned_students = task_student_map.get(task.id, set())
-        for student in students:
-            key = f"{task.id}-{student.id}"
-            st = st_map.get((task.id, student.id))
-            if st:
-                cells[key] = {
-                    "status": st.status,
-                    "grade": st.grade if st.status == "accepted" else None,
-                    "submission_id": st.id
-                }
-            elif student.id in assigned_students:
-                cells[key] = {
-                    "status": "assigned",
-                    "grade": None,
-                    "submission_id": None
-                }
-            else:
-                cells[key] = {
-                    "status": "not_assigned",
-                    "grade": None,
-                    "submission_id": None
-                }
 
-    return {
-        "students": [
-            {"id": s.id, "full_name": s.full_name}
-            for s in students
-        ],
-        "tasks": [
-            {
-                "id": t.id,
-                "title": t.title,
-                "subject": t.subject,
-                "due_date": t.due_date
-            }
-            for t in tasks
-        ],
-        "cells": cells
-    }
 @router.get("/students/{student_id}/grades")
 def get_student_grades(
     student_id: int,
+    view: str = "tasks",
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
+    """
+    view=tasks — оценки по каждому заданию, сгруппированные по предметам;
+    view=summary — табель: сводка по предметам из student_subject_summary,
+    без чтения student_task/tasks.
+    """
+    if view not in GRADES_VIEWS:
+        raise HTTPException(status_code=400, detail="view must be 'tasks' or 'summary'")
+
     # === Получаем ученика ===
     student = db.query(User).filter(
         User.id == student_id,
@@ -596,6 +795,9 @@ def get_student_grades(
     else:
         raise HTTPException(status_code=403, detail="Доступ запрещён")
 
+    if view == "summary":
+        return {"student": _student_info(student), "summary": get_student_summary(db, student.id)}
+
     # === Получаем задания ===
     tasks = db.query(TaskModel).filter(
         TaskModel.grade == student.grade
@@ -628,29 +830,25 @@ def get_student_grades(
             "grade": submission.grade if submission and submission.status == "accepted" else None,
         })
 
-    return {
-        "student": {
-            "id": student.id,
-            "full_name": student.full_name,
-            "grade": student.grade
-        },
-        "subjects": subjects
-    }
+    return {"student": _student_info(student), "subjects": subjects}
 @router.get("/submission/detail")
 def get_submission_detail(
     task_id: int,
     student_id: int,
     grade: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
     # Получаем задание
-    task = db.query(TaskModel).filter(
-        TaskModel.id == task_id,
-        TaskModel.grade == grade
-    ).first()
-    if not task:
+    row = (
+        db.query(TaskModel, User.full_name)
+        .outerjoin(User, User.id == TaskModel.teacher_id)
+        .filter(TaskModel.id == task_id, TaskModel.grade == grade)
+        .first()
+    )
+    if not row:
         raise HTTPException(status_code=404, detail="Задание не найдено")
+    task, teacher_name = row
 
     # Проверка доступа
     if current_user.role == "teacher":
@@ -674,9 +872,7 @@ def get_submission_detail(
     ).first()
 
     # Собираем данные (даже если submission = None)
-    submission_dir = SUBMISSION_UPLOAD_DIR / str(task_id) / str(student_id)
-    student_files = [f.name for f in submission_dir.iterdir() if f.is_file()] if submission_dir.exists() else []
-    teacher = db.query(User.full_name).filter(User.id == task.teacher_id).first()
+    student_files = crud_task_file.get_submission_file_names(db, [(task_id, student_id)]).get((task_id, student_id), [])
 
     response = {
         "id": submission.id if submission else None,
@@ -685,7 +881,7 @@ def get_submission_detail(
         "task_title": task.title,
         "description": task.description,
         "subject": task.subject,
-        "teacher_name": teacher[0] if teacher else "—",
+        "teacher_name": teacher_name or "—",
         "task_enable_ai_analysis": task.enable_ai_analysis,
         "student_name": student.full_name,
         "grade": task.grade,
@@ -705,18 +901,24 @@ def get_submission_detail(
 
 @router.get("/my/grades")
 def get_my_grades(
+    view: str = "tasks",
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Для ученика: получить только его собственные задания и оценки.
     Учитель или админ не могут использовать этот эндпоинт.
+    view=summary — только сводка по предметам (см. get_student_grades).
     """
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Только для учеников")
+    if view not in GRADES_VIEWS:
+        raise HTTPException(status_code=400, detail="view must be 'tasks' or 'summary'")
 
     student_id = current_user.id
     student = current_user  # уже загружен через get_current_user
+    if view == "summary":
+        return {"student": _student_info(student), "summary": get_student_summary(db, student_id)}
 
     # Получаем все StudentTask для текущего ученика
     student_tasks = db.query(StudentTask).filter(
@@ -724,14 +926,7 @@ def get_my_grades(
     ).all()
 
     if not student_tasks:
-        return {
-            "student": {
-                "id": student.id,
-                "full_name": student.full_name,
-                "grade": student.grade
-            },
-            "subjects": {}
-        }
+        return {"student": _student_info(student), "subjects": {}}
 
     task_ids = [st.task_id for st in student_tasks]
     tasks = db.query(TaskModel).filter(TaskModel.id.in_(task_ids)).all()
@@ -751,11 +946,4 @@ def get_my_grades(
             "grade": submission.grade if submission.status == "accepted" else None,
         })
 
-    return {
-        "student": {
-            "id": student.id,
-            "full_name": student.full_name,
-            "grade": student.grade
-        },
-        "subjects": subjects
-    }
\ No newline at end of file
+    return {"student": _student_info(student), "subjects": subjects}
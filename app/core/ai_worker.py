@@ -0,0 +1,169 @@
+# app/core/ai_worker.py
+"""
+Воркер очереди ИИ-анализа (таблица ai_jobs).
+
+Работает внутри приложения (AI_WORKER_IN_PROCESS, запускается в lifespan)
+или отдельным процессом: python -m app.core.ai_worker.
+- одновременно не больше AI_JOB_CONCURRENCY вызовов ИИ;
+- 5xx/429/таймауты повторяются с экспоненциальной задержкой, до AI_JOB_MAX_ATTEMPTS;
+- задачи в running с истёкшей арендой (процесс упал/перезапущен) возвращаются
+  в pending периодически; при старте внутри приложения — все running сразу,
+  не дожидаясь аренды (при нескольких воркерах uvicorn чужая задача может
+  выполниться повторно — результат первого тогда отбросит finish_job).
+В отдельном процессе событие ai_analysis публикуется в его собственный брокер
+и до SSE-клиентов приложения не доходит (см. app/core/events.py).
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import joinedload
+
+from app.core.ai_service import AIServiceError, analyze_and_save_ai
+from app.core.config import settings
+from app.core.http_clients import close_http_clients
+from app.crud.ai_job import claim_jobs, finish_job, recover_stale_jobs
+from app.db.models.ai_job import AIJob
+from app.db.models.student_task import StudentTask
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempts: int) -> float:
+    delay = settings.AI_JOB_BACKOFF_BASE_SECONDS * 2 ** max(0, attempts - 1)
+    return min(delay, settings.AI_JOB_BACKOFF_MAX_SECONDS)
+
+
+class AIWorker:
+    def __init__(self, concurrency: int = settings.AI_JOB_CONCURRENCY):
+        self.concurrency = concurrency
+        self._running = set()  # ссылки на задачи, чтобы их не собрал GC
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._main: Optional[asyncio.Task] = None
+
+    def wake(self):
+        """Новая задача в очереди — не ждать следующего опроса (вызов из любого потока)"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run_job(self, job_id: int, locked_at: datetime):
+        try:
+            async with AsyncSessionLocal() as db:
+                job = await db.get(AIJob, job_id)
+                if job is None:
+                    return  # работу удалили вместе с задачей
+                student_task = await db.get(
+                    StudentTask, job.student_task_id, options=[joinedload(StudentTask.task)]
+                )
+                attempts = job.attempts
+            if student_task is None:
+                async with AsyncSessionLocal() as db:
+                    await finish_job(db, job_id, locked_at, "failed", "Работа удалена")
+                return
+
+            # Сессия не держится открытой на время вызова ИИ
+            await analyze_and_save_ai(
+                student_task_id=student_task.id,
+                teacher_task=student_task.task.description,
+                student_answer=student_task.comment or ""
+            )
+            async with AsyncSessionLocal() as db:
+                await finish_job(db, job_id, locked_at, "done")
+        except AIServiceError as e:
+            async with AsyncSessionLocal() as db:
+                if e.retryable and attempts < settings.AI_JOB_MAX_ATTEMPTS:
+                    delay = backoff_delay(attempts)
+                    logger.warning(f"⚠️ [AI jobs] job={job_id}: {e}; повтор через {delay:.0f} с")
+                    await finish_job(
+                        db, job_id, locked_at, "pending", str(e),
+                        next_run_at=datetime.utcnow() + timedelta(seconds=delay),
+                    )
+                else:
+                    logger.error(f"❌ [AI jobs] job={job_id} не выполнена: {e}")
+                    await finish_job(db, job_id, locked_at, "failed", str(e))
+        except Exception as e:
+            logger.exception(f"🔥 [AI jobs] Критическая ошибка job={job_id}: {e}")
+            async with AsyncSessionLocal() as db:
+                await finish_job(db, job_id, locked_at, "failed", repr(e))
+
+    async def run(self, recover_all: bool = False):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        next_recovery = 0.0
+        logger.info(f"🚀 [AI jobs] Воркер запущен, параллельность {self.concurrency}")
+        while True:
+            try:
+                now = self._loop.time()
+                if now >= next_recovery:
+                    async with AsyncSessionLocal() as db:
+                        recovered = await recover_stale_jobs(db, expired_only=not recover_all)
+                    recover_all = False  # далее — только по истечении аренды
+                    if recovered:
+                        logger.info(f"♻️ [AI jobs] Возвращено в очередь: {recovered}")
+                    next_recovery = now + settings.AI_JOB_LEASE_SECONDS / 2
+
+                free = self.concurrency - len(self._running)
+                if free > 0:
+                    async with AsyncSessionLocal() as db:
+                        claimed = await claim_jobs(db, free)
+                    for job_id, locked_at in claimed:
+                        task = asyncio.create_task(self._run_job(job_id, locked_at))
+                        self._running.add(task)
+                        task.add_done_callback(self._on_done)
+            except Exception as e:
+                logger.error(f"❌ [AI jobs] Ошибка опроса очереди: {e}", exc_info=True)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.AI_JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def _on_done(self, task: asyncio.Task):
+        self._running.discard(task)
+        if self._wakeup is not None:
+            self._wakeup.set()  # освободился слот
+
+    def start(self):
+        """Запуск внутри приложения: running от прошлого запуска процесса возвращаются сразу"""
+        if self._main is None:
+            self._main = asyncio.create_task(self.run(recover_all=True))
+
+    async def stop(self):
+        """
+        Останавливает опрос и прерывает начатые вызовы: их задачи остаются в running
+        и вернутся в очередь по истечении аренды.
+        """
+        tasks = [t for t in (self._main, *self._running) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._main = None
+        self._running.clear()
+
+
+ai_worker = AIWorker()
+
+
+async def start_ai_worker():
+    if settings.AI_WORKER_IN_PROCESS:
+        ai_worker.start()
+
+
+async def stop_ai_worker():
+    await ai_worker.stop()
+
+
+async def _run_standalone():
+    try:
+        await ai_worker.run()
+    finally:
+        await close_http_clients()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run_standalone())
@@ -4,7 +4,81 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-super-secret-jwt-key-change-in-prod"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080
+    # Класть id/role/grade в JWT, чтобы проверки ролей обходились без БД.
+    # Токен сверяется с users.token_version (кэш на USER_CACHE_TTL_SECONDS): после смены
+    # класса/пароля, подтверждения или удаления пользователя старый токен перестаёт
+    # действовать сразу в этом процессе и не позже TTL кэша — в остальных
+    AUTH_TOKEN_CLAIMS: bool = False
+    # Кэш пользователей для get_current_user (0 — выключен)
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    USER_CACHE_MAX_SIZE: int = 1024
+    # Размер пула процессов для pbkdf2 (0 — хэшировать в текущем потоке)
+    PASSWORD_HASH_WORKERS: int = 2
     DATABASE_URL: str = "sqlite:///./school.db"
+    # Пул соединений SQLAlchemy
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_PRE_PING: bool = True
+    # Настройки SQLite (применяются при каждом подключении)
+    SQLITE_WAL: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456
+    # Счётчик SQL-запросов на HTTP-запрос и детектор N+1
+    QUERY_STATS_ENABLED: bool = True
+    QUERY_STATS_HEADERS: bool = False  # X-DB-* в ответах — только для отладки
+    QUERY_STATS_N_PLUS_ONE_THRESHOLD: int = 5
+    # Сколько секунд кэшировать total в режиме курсорной пагинации
+    PAGINATION_TOTAL_CACHE_TTL: float = 30.0
+    # Кэш журнала оценок (grade, teacher, subject); сбрасывается при изменениях
+    GRADEBOOK_CACHE_TTL: float = 300.0
+    # Загрузка файлов: размер части и лимиты в байтах
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_MAX_FILE_BYTES: int = 250 * 1024 * 1024
+    UPLOAD_MAX_REQUEST_BYTES: int = 500 * 1024 * 1024
+    # Хранилище файлов по SHA-256 и задержка перед удалением blob'ов без ссылок
+    UPLOAD_BLOB_DIR: str = "uploads/blobs"
+    BLOB_GC_GRACE_SECONDS: int = 3600
+    # Скачивание: "" — отдаёт приложение, "x-accel" — nginx (internal location
+    # DOWNLOAD_ACCEL_PREFIX смотрит на UPLOAD_BLOB_DIR), "x-sendfile" — Apache/lighttpd
+    DOWNLOAD_OFFLOAD: str = ""
+    DOWNLOAD_ACCEL_PREFIX: str = "/protected-blobs"
+    DOWNLOAD_CACHE_MAX_AGE: int = 31536000
+    # Фоновая очистка uploads/: сверка с БД раз в интервал, пачками с паузой
+    STORAGE_CLEANUP_ENABLED: bool = True
+    STORAGE_RECONCILE_INTERVAL: float = 3600.0
+    STORAGE_RECONCILE_BATCH: int = 100
+    STORAGE_RECONCILE_PAUSE: float = 1.0
+    STORAGE_STOP_TIMEOUT: float = 5.0  # сколько ждать поток очистки при остановке
+    # /api/sync: перекрытие окна (незакоммиченные на момент выдачи токена изменения)
+    # и срок хранения tombstone'ов; токен старше срока — полная выгрузка
+    SYNC_OVERLAP_SECONDS: int = 5
+    SYNC_TOMBSTONE_TTL_DAYS: int = 30
+    # SSE (/api/events): keepalive-комментарий, пауза переподключения, очередь на соединение
+    SSE_KEEPALIVE_SECONDS: float = 15.0
+    SSE_RETRY_MS: int = 5000
+    SSE_QUEUE_SIZE: int = 100
+    # Одноразовый по смыслу токен для ?token= (EventSource не шлёт Authorization)
+    SSE_TOKEN_TTL_SECONDS: int = 120
+    # Брокер событий живёт в памяти процесса: при нескольких воркерах uvicorn или
+    # AI_WORKER_IN_PROCESS=False события других процессов (в т.ч. ai_analysis) до SSE не дойдут
+    # Очередь ИИ-анализа (ai_jobs): воркер внутри приложения или python -m app.core.ai_worker
+    AI_WORKER_IN_PROCESS: bool = True
+    AI_JOB_CONCURRENCY: int = 4
+    AI_JOB_MAX_ATTEMPTS: int = 5
+    AI_JOB_BACKOFF_BASE_SECONDS: float = 10.0
+    AI_JOB_BACKOFF_MAX_SECONDS: float = 600.0
+    AI_JOB_LEASE_SECONDS: float = 300.0  # running дольше — воркер считается упавшим
+    AI_JOB_POLL_SECONDS: float = 2.0
+    # Общие HTTP-клиенты внешних API (app/core/http_clients.py)
+    HTTP_CLIENT_HTTP2: bool = False
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    GEN_API_MAX_CONNECTIONS: int = 20
+    GEN_API_MAX_KEEPALIVE: int = 10
+    LNO_MAX_CONNECTIONS: int = 10
+    LNO_MAX_KEEPALIVE: int = 5
     GEN_API_TOKEN: str
     LNO_API_BASE_URL: str
     LNO_USERNAME: str
@@ -0,0 +1,164 @@
+# app/core/downloads.py
+"""
+Отдача вложений: файлы в хранилище адресуются по SHA-256 и никогда
+не меняются, поэтому ETag — это хеш, а ответ можно кешировать как immutable.
+Поддерживаются If-None-Match (304), Range (206/416) и, по настройке,
+отдача самих байтов через nginx (X-Accel-Redirect) или X-Sendfile.
+
+Content-Type, присланному клиентом при загрузке, не доверяем: тип берётся
+по расширению из белого списка (без HTML/SVG — они исполнялись бы в домене API),
+остальное отдаётся как application/octet-stream с nosniff.
+"""
+import os
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from app.core.config import settings
+from app.db.models.task_file import TaskFile
+
+CHUNK_SIZE = 64 * 1024
+
+SAFE_MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "txt": "text/plain",
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "bmp": "image/bmp",
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+    "ogg": "audio/ogg",
+    "mp4": "video/mp4",
+    "webm": "video/webm",
+    "doc": "application/msword",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "xls": "application/vnd.ms-excel",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ppt": "application/vnd.ms-powerpoint",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "odt": "application/vnd.oasis.opendocument.text",
+    "zip": "application/zip",
+}
+
+
+def safe_media_type(filename: str) -> str:
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return SAFE_MEDIA_TYPES.get(ext, "application/octet-stream")
+
+
+def _content_disposition(disposition_type: str, filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition_type}; filename*=utf-8''{quoted}"
+    return f'{disposition_type}; filename="{filename}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Слабое сравнение (RFC 9110): W/"x" и "x" совпадают
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag.removeprefix("W/") in tags
+
+
+def _parse_range(header: str, size: int) -> Optional[tuple]:
+    """
+    Разбирает Range: bytes=start-end. Возвращает (start, end) включительно,
+    None — если заголовок не поддерживается (тогда отдаём весь файл),
+    (None, None) — если диапазон невыполним (416).
+    Несколько диапазонов в одном запросе не поддерживаем — отдаём файл целиком.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_s, sep, end_s = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if start_s == "":
+            length = int(end_s)
+            if length <= 0:
+                return (None, None)
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+            if end_s and start > end:
+                # синтаксически неверный диапазон игнорируется (RFC 9110 §14.2)
+                return None
+    except ValueError:
+        return None
+    if start >= size:
+        return (None, None)
+    return start, min(end, size - 1)
+
+
+def _iter_file(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_download_response(
+    request: Request,
+    task_file: TaskFile,
+    disposition_type: str = "attachment",
+) -> Response:
+    path = task_file.path
+    media_type = safe_media_type(task_file.filename)
+    if media_type == "application/octet-stream":
+        disposition_type = "attachment"
+    headers = {
+        "Cache-Control": f"private, max-age={settings.DOWNLOAD_CACHE_MAX_AGE}, immutable",
+        "Content-Disposition": _content_disposition(disposition_type, task_file.filename),
+        "X-Content-Type-Options": "nosniff",
+    }
+    etag = f'"{task_file.sha256}"' if task_file.sha256 else None
+    if etag:
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+    # Байты отдаёт веб-сервер; приложение сделало только проверку доступа
+    if settings.DOWNLOAD_OFFLOAD == "x-accel":
+        relative = Path(path).relative_to(settings.UPLOAD_BLOB_DIR).as_posix()
+        headers["X-Accel-Redirect"] = f"{settings.DOWNLOAD_ACCEL_PREFIX.rstrip('/')}/{relative}"
+        return Response(headers=headers, media_type=media_type)
+    if settings.DOWNLOAD_OFFLOAD == "x-sendfile":
+        headers["X-Sendfile"] = os.path.abspath(path)
+        return Response(headers=headers, media_type=media_type)
+
+    headers["Accept-Ranges"] = "bytes"
+    size = os.path.getsize(path)
+    range_header = request.headers.get("range")
+    # If-Range с другим ETag — файл мог измениться, отдаём целиком
+    if range_header and (not request.headers.get("if-range") or request.headers["if-range"] == etag):
+        byte_range = _parse_range(range_header, size)
+        if byte_range == (None, None):
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                _iter_file(path, start, end - start + 1),
+                status_code=206,
+                headers=headers,
+                media_type=media_type,
+            )
+
+    return FileResponse(path, headers=headers, media_type=media_type)
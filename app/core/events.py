@@ -0,0 +1,105 @@
+# app/core/events.py
+"""
+Pub/sub внутри процесса для SSE (/api/events).
+
+На каждое открытое соединение — своя ограниченная очередь; publish раскладывает
+событие по очередям пользователя. publish можно вызывать и из sync-эндпоинтов
+(пул потоков): очереди наполняются через call_soon_threadsafe своего event loop.
+Подписчики живут в памяти процесса: при нескольких воркерах uvicorn событие
+увидят только соединения того же воркера, а события, опубликованные другим
+процессом, теряются — в том числе ai_analysis, если ИИ-воркер запущен отдельно
+(AI_WORKER_IN_PROCESS=False, python -m app.core.ai_worker). SSE рассчитан на один
+процесс приложения; клиенту стоит перечитывать данные после переподключения.
+Открытые потоки держат graceful shutdown uvicorn, поэтому запускать его стоит
+с --timeout-graceful-shutdown.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Сигнал подписчику закрыть поток (остановка приложения)
+CLOSE = object()
+
+
+class EventBroker:
+    def __init__(self, queue_size: int = settings.SSE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)  # user_id -> {(loop, queue)}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if not subscribers:
+                return
+            subscribers.difference_update({item for item in subscribers if item[1] is queue})
+            if not subscribers:
+                del self._subscribers[user_id]
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Медленный клиент: событие теряется, он догонит состояние через /api/sync
+            logger.warning("⚠️ [Events] Очередь подписчика переполнена, событие отброшено")
+
+    def publish(self, user_ids: Iterable[Optional[int]], event: str, data: dict):
+        message = (next(self._ids), event, data)
+        with self._lock:
+            targets = [
+                item
+                for user_id in set(user_ids) if user_id is not None
+                for item in self._subscribers.get(user_id, ())
+            ]
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, message)
+            except RuntimeError:
+                pass  # loop уже закрыт
+
+    def close_all(self):
+        with self._lock:
+            targets = [item for subscribers in self._subscribers.values() for item in subscribers]
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, CLOSE)
+            except RuntimeError:
+                pass
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+broker = EventBroker()
+
+
+def format_sse(message) -> str:
+    event_id, event, data = message
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+def notify_graded(student_id: int, submission_id: int, task_id: int, status: str, grade: Optional[int] = None):
+    broker.publish([student_id], "graded", {
+        "submission_id": submission_id,
+        "task_id": task_id,
+        "status": status,
+        "grade": grade,
+    })
@@ -0,0 +1,139 @@
+# app/core/http_clients.py
+"""
+Общие HTTP-клиенты для внешних API: по одному пулу соединений на upstream
+(gen-api.ru и LNO) вместо нового httpx.AsyncClient с TLS-рукопожатием на каждый вызов.
+
+Клиенты создаются в lifespan приложения (open_http_clients) и закрываются
+при остановке; вне приложения (python -m app.core.ai_worker) создаются
+лениво при первом обращении. HTTP/2 включается HTTP_CLIENT_HTTP2 и требует
+пакета h2 (pip install httpx[http2]); без него клиент работает по HTTP/1.1.
+
+Клиент общий для всех пользователей (LNO — разные учётные записи по teacher_id),
+поэтому cookie не сохраняются: пользователя определяет только заголовок
+Authorization конкретного запроса.
+"""
+import importlib.util
+import logging
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UpstreamConfig:
+    timeout: httpx.Timeout
+    max_connections: int
+    max_keepalive_connections: int
+
+
+UPSTREAMS: Dict[str, UpstreamConfig] = {
+    "gen_api": UpstreamConfig(
+        timeout=httpx.Timeout(10.0, read=45.0),
+        max_connections=settings.GEN_API_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.GEN_API_MAX_KEEPALIVE,
+    ),
+    "lno": UpstreamConfig(
+        timeout=httpx.Timeout(10.0, read=15.0),
+        max_connections=settings.LNO_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LNO_MAX_KEEPALIVE,
+    ),
+}
+
+
+class _CountingTransport(httpx.AsyncHTTPTransport):
+    """Транспорт httpx со счётчиками запросов для pool_stats()"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.http2 = kwargs.get("http2", False)
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests_total += 1
+        self.in_flight += 1
+        try:
+            return await super().handle_async_request(request)
+        except Exception:
+            self.errors_total += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        connections = self._pool.connections
+        return {
+            "http2": self.http2,
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "in_flight": self.in_flight,
+            "connections": len(connections),
+            "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+        }
+
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_transports: Dict[str, _CountingTransport] = {}
+
+
+def _make_transport(config: UpstreamConfig) -> _CountingTransport:
+    limits = httpx.Limits(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive_connections,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+    http2 = settings.HTTP_CLIENT_HTTP2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("⚠️ [HTTP] HTTP/2 включён, но пакет h2 не установлен — используем HTTP/1.1")
+        http2 = False
+    return _CountingTransport(limits=limits, http2=http2)
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        config = UPSTREAMS[name]
+        transport = _make_transport(config)
+        client = httpx.AsyncClient(
+            transport=transport,
+            timeout=config.timeout,
+            # Пустой список разрешённых доменов — Set-Cookie игнорируется
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+        )
+        _clients[name] = client
+        _transports[name] = transport
+    return client
+
+
+def get_gen_api_client() -> httpx.AsyncClient:
+    return get_client("gen_api")
+
+
+def get_lno_client() -> httpx.AsyncClient:
+    return get_client("lno")
+
+
+async def open_http_clients():
+    for name in UPSTREAMS:
+        get_client(name)
+
+
+async def close_http_clients():
+    for name in list(_clients):
+        await _clients.pop(name).aclose()
+        _transports.pop(name, None)
+
+
+def pool_stats() -> Dict[str, Optional[dict]]:
+    """Состояние пулов: None — клиент ещё не создан"""
+    return {
+        name: (_transports[name].stats() if name in _transports else None)
+        for name in UPSTREAMS
+    }
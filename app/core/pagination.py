@@ -0,0 +1,56 @@
+# app/core/pagination.py
+import base64
+import json
+from typing import Callable, Hashable, Optional
+
+from fastapi import HTTPException
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# Кэш total для режима курсора: точный COUNT(*) не пересчитывается на каждой странице
+total_count_cache = TTLCache(maxsize=1024, ttl=settings.PAGINATION_TOTAL_CACHE_TTL)
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный cursor")
+
+
+def keyset_page(query, id_column, cursor: str, size: int, get_id: Callable = lambda row: row.id):
+    """
+    Страница по курсору для сортировки id DESC: WHERE id < :last_id LIMIT size + 1.
+    Пустой cursor — первая страница. Возвращает (rows, next_cursor).
+    """
+    if cursor:
+        query = query.filter(id_column < decode_cursor(cursor))
+    rows = query.order_by(id_column.desc()).limit(size + 1).all()
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    return rows, encode_cursor(get_id(rows[-1]))
+
+
+def cached_count(key: Hashable, query) -> int:
+    total = total_count_cache.get(key)
+    if total is None:
+        total = query.count()
+        total_count_cache.put(key, total)
+    return total
+
+
+def cursor_page_response(items: list, next_cursor: Optional[str], size: int, total: Optional[int]) -> dict:
+    return {
+        "items": items,
+        "next_cursor": next_cursor,
+        "size": size,
+        "total": total,
+    }
@@ -0,0 +1,95 @@
+# app/core/query_stats.py
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """Счётчики SQL-запросов в рамках одного HTTP-запроса"""
+    count: int = 0
+    total_time: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+    def repeated(self, threshold: int) -> dict:
+        """Одинаковые запросы, выполненные threshold+ раз — признак N+1"""
+        return {sql: n for sql, n in self.statements.items() if n >= threshold}
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def get_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start_time")
+    if starts:
+        stats.total_time += time.perf_counter() - starts.pop()
+    stats.count += 1
+    stats.statements[statement] += 1
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI-middleware: считает запросы к БД и время в БД на каждый HTTP-запрос,
+    отдаёт их в заголовках X-DB-* и пишет в лог повторяющиеся запросы (N+1).
+    Контекст копируется в пул потоков, поэтому sync-эндпоинты тоже учитываются.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.QUERY_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        threshold = settings.QUERY_STATS_N_PLUS_ONE_THRESHOLD
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start" and settings.QUERY_STATS_HEADERS:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.total_time * 1000:.1f}".encode()))
+                headers.append((b"x-db-repeated-queries", str(len(stats.repeated(threshold))).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current_stats.reset(token)
+            self._log(scope, stats, threshold)
+
+    @staticmethod
+    def _log(scope, stats: QueryStats, threshold: int):
+        path = f'{scope["method"]} {scope["path"]}'
+        logger.debug(
+            f"🗄️ [DB] {path}: {stats.count} запросов, {stats.total_time * 1000:.1f} мс"
+        )
+        for sql, n in stats.repeated(threshold).items():
+            logger.warning(f"⚠️ [DB] Возможный N+1 в {path}: {n}× {' '.join(sql.split())[:200]}")
@@ -1,5 +1,10 @@
 # app/core/security.py
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime, timedelta
+from typing import Iterable
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from app.core.config import settings
@@ -12,17 +17,92 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-def create_access_token(data: dict, expires_delta: timedelta | None = None):
+
+# === Пул для хэширования паролей ===
+# pbkdf2 нагружает CPU: выносим его в отдельные процессы, чтобы логины
+# и массовое создание учеников не занимали event loop и потоки запросов.
+
+_hash_executor: Executor | None = None
+_hash_executor_lock = threading.Lock()
+
+
+def get_hash_executor() -> Executor | None:
+    """Ленивый пул процессов; None, если PASSWORD_HASH_WORKERS = 0"""
+    global _hash_executor
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    if _hash_executor is None:
+        with _hash_executor_lock:
+            if _hash_executor is None:
+                _hash_executor = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _hash_executor
+
+
+def shutdown_hash_executor():
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is not None:
+            _hash_executor.shutdown(wait=True)
+            _hash_executor = None
+
+
+def get_password_hash_pooled(password: str) -> str:
+    executor = get_hash_executor()
+    if executor is None:
+        return get_password_hash(password)
+    return executor.submit(get_password_hash, password).result()
+
+
+def hash_passwords(passwords: Iterable[str]) -> list[str]:
+    """Хэширует пачку паролей параллельно, порядок сохраняется"""
+    passwords = list(passwords)
+    executor = get_hash_executor()
+    if executor is None or len(passwords) < 2:
+        return [get_password_hash_pooled(p) for p in passwords]
+    return list(executor.map(get_password_hash, passwords))
+
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_executor(), get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_executor(), verify_password, plain_password, hashed_password)
+
+
+def create_access_token(data: dict, expires_delta: timedelta | None = None, user=None):
     to_encode = data.copy()
+    # Claims для быстрых проверок ролей без похода в БД (см. deps.get_current_principal)
+    if user is not None and settings.AUTH_TOKEN_CLAIMS:
+        to_encode.update({
+            "uid": user.id,
+            "role": user.role,
+            "grade": user.grade,
+            "tv": user.token_version or 0,
+        })
     # ⏳ Токен теперь живёт 24 часа по умолчанию
     expire = datetime.utcnow() + (expires_delta or timedelta(hours=6))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
+def create_stream_token(user) -> str:
+    """Короткоживущий токен только для SSE (?token=): в логах доступа не светится основной"""
+    expire = datetime.utcnow() + timedelta(seconds=settings.SSE_TOKEN_TTL_SECONDS)
+    return jwt.encode(
+        {"sub": user.email, "scope": "sse", "exp": expire},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+
 def decode_access_token(token: str) -> dict:
     """Декодирует JWT-токен и возвращает payload"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
     except JWTError:
-        raise JWTError("Could not validate credentials")
\ No newline at end of file
+        raise JWTError("Could not validate credentials")
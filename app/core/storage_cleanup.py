@@ -0,0 +1,155 @@
+# app/core/storage_cleanup.py
+"""
+Фоновая очистка файлового хранилища.
+
+Удаление задания только ставит его каталоги в очередь (enqueue_cleanup),
+а сами файлы удаляет поток-обработчик, чтобы запрос не ждал rmtree.
+Когда очередь пуста, тот же поток раз в STORAGE_RECONCILE_INTERVAL сверяет
+uploads/ с БД: удаляет каталоги заданий и учеников, которых уже нет
+(пачками с паузой, чтобы не нагружать диск), запускает сборщик blob'ов
+и чистит устаревшие tombstone'ы синхронизации.
+Если процесс упал с непустой очередью — недоудалённое подберёт сверка.
+"""
+import asyncio
+import logging
+import queue
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Те же пути, что и в app/api/tasks.py
+TASK_UPLOAD_DIR = Path("uploads/tasks")
+SUBMISSION_UPLOAD_DIR = Path("uploads/submissions")
+
+_queue: "queue.Queue[Optional[Path]]" = queue.Queue()
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+_stopping = threading.Event()
+
+
+def enqueue_cleanup(*paths: Path) -> None:
+    for path in paths:
+        _queue.put(Path(path))
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    elif path.exists():
+        path.unlink(missing_ok=True)
+
+
+def _numeric_dirs(root: Path) -> Iterator[Path]:
+    if not root.exists():
+        return
+    for path in root.iterdir():
+        if path.is_dir() and path.name.isdigit():
+            yield path
+
+
+def find_orphans(db) -> List[Path]:
+    """Каталоги в uploads/, для которых в БД нет задания или назначения ученику"""
+    from app.db.models.task import Task as TaskModel
+    from app.db.models.student_task import StudentTask
+
+    task_ids = {task_id for (task_id,) in db.query(TaskModel.id)}
+    orphans = [path for path in _numeric_dirs(TASK_UPLOAD_DIR) if int(path.name) not in task_ids]
+    for task_dir in _numeric_dirs(SUBMISSION_UPLOAD_DIR):
+        task_id = int(task_dir.name)
+        if task_id not in task_ids:
+            orphans.append(task_dir)
+            continue
+        student_ids = {
+            sid for (sid,) in db.query(StudentTask.student_id).filter(StudentTask.task_id == task_id)
+        }
+        orphans.extend(
+            path for path in _numeric_dirs(task_dir) if int(path.name) not in student_ids
+        )
+    return orphans
+
+
+def reconcile(
+    batch_size: int = settings.STORAGE_RECONCILE_BATCH,
+    pause: float = settings.STORAGE_RECONCILE_PAUSE,
+) -> int:
+    """Удаляет брошенные каталоги пачками и собирает blob'ы без ссылок. Возвращает число каталогов."""
+    from app.crud.file_blob import collect_garbage
+    from app.crud.sync import prune_tombstones
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        orphans = find_orphans(db)
+        for i in range(0, len(orphans), batch_size):
+            # Пауза прерывается остановкой приложения; остаток подберёт следующая сверка
+            if i and _stopping.wait(pause):
+                return i
+            for path in orphans[i:i + batch_size]:
+                _remove(path)
+        if orphans:
+            logger.info(f"🧹 [Storage] Удалено брошенных каталогов: {len(orphans)}")
+        collect_garbage(db)
+        # Заодно — tombstone'ы /api/sync старше срока хранения
+        prune_tombstones(db)
+    finally:
+        db.close()
+    return len(orphans)
+
+
+def _run():
+    next_reconcile = time.monotonic() + settings.STORAGE_RECONCILE_INTERVAL
+    while True:
+        timeout = max(0.0, next_reconcile - time.monotonic())
+        try:
+            path = _queue.get(timeout=timeout)
+        except queue.Empty:
+            try:
+                reconcile()
+            except Exception as e:
+                logger.error(f"❌ [Storage] Ошибка сверки хранилища: {e}", exc_info=True)
+            next_reconcile = time.monotonic() + settings.STORAGE_RECONCILE_INTERVAL
+            continue
+        if path is None:
+            return
+        try:
+            _remove(path)
+        except Exception as e:
+            logger.error(f"❌ [Storage] Не удалось удалить {path}: {e}", exc_info=True)
+
+
+def start_storage_worker():
+    global _worker
+    if not settings.STORAGE_CLEANUP_ENABLED:
+        return
+    with _worker_lock:
+        if _worker is None:
+            _stopping.clear()
+            _worker = threading.Thread(target=_run, name="storage-cleanup", daemon=True)
+            _worker.start()
+
+
+async def stop_storage_worker():
+    """
+    Ждёт удаления того, что уже в очереди, не дольше STORAGE_STOP_TIMEOUT и не блокируя
+    event loop. Не успевший поток (daemon) бросаем: недоудалённое подберёт сверка.
+    """
+    global _worker
+    with _worker_lock:
+        worker, _worker = _worker, None
+    if worker is None:
+        return
+    _stopping.set()
+    _queue.put(None)
+    await asyncio.to_thread(worker.join, settings.STORAGE_STOP_TIMEOUT)
+    if worker.is_alive():
+        logger.warning("⚠️ [Storage] Поток очистки не остановился вовремя — завершаем без него")
+
+
+if __name__ == "__main__":
+    print(f"✅ Удалено каталогов: {reconcile()}")
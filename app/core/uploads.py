@@ -0,0 +1,169 @@
+# app/core/uploads.py
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.crud.file_blob import BLOB_DIR, acquire_blobs, blob_path, discard_blobs
+
+
+@dataclass
+class StoredUpload:
+    """Сохранённый файл; поля совпадают с аргументами crud.task_file.add_task_file"""
+    original_name: str
+    filename: str
+    path: str
+    size: int
+    content_type: Optional[str]
+    sha256: str
+
+
+def make_safe_name(original_name: str) -> str:
+    ext = original_name.split('.')[-1] if '.' in original_name else ''
+    return f"{uuid.uuid4().hex}.{ext}" if ext else uuid.uuid4().hex
+
+
+class _AtomicWriter:
+    """
+    Пишет файл по частям во временный .part-файл, считая SHA-256 на лету.
+    В хранилище файл переносит UploadBatch.claim — после захвата строки file_blobs.
+    """
+
+    def __init__(self, batch: "UploadBatch", file: UploadFile):
+        tmp_dir = BLOB_DIR / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.batch = batch
+        self.original_name = file.filename
+        self.content_type = file.content_type
+        self.filename = make_safe_name(file.filename)
+        self.tmp_path = tmp_dir / f".{self.filename}.part"
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self._f = open(self.tmp_path, "wb")
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.batch.max_file_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Файл {self.original_name} больше {self.batch.max_file_bytes // (1024 * 1024)} МБ"
+            )
+        self.batch.consume(len(chunk))
+        self.sha256.update(chunk)
+        self._f.write(chunk)
+
+    def commit(self) -> StoredUpload:
+        self._f.close()
+        sha256 = self.sha256.hexdigest()
+        return StoredUpload(
+            original_name=self.original_name,
+            filename=self.filename,
+            path=str(blob_path(sha256)),
+            size=self.size,
+            content_type=self.content_type,
+            sha256=sha256,
+        )
+
+    def abort(self):
+        self._f.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+class UploadBatch:
+    """
+    Файлы одного HTTP-запроса: общий лимит на запрос и откат
+    (удаление blob'ов, созданных этим запросом), если запрос не удался.
+    claim() в транзакции запроса увеличивает счётчики ссылок и переносит файлы в хранилище.
+    """
+
+    def __init__(
+        self,
+        max_file_bytes: int = settings.UPLOAD_MAX_FILE_BYTES,
+        max_request_bytes: int = settings.UPLOAD_MAX_REQUEST_BYTES,
+        chunk_size: int = settings.UPLOAD_CHUNK_SIZE,
+    ):
+        self.max_file_bytes = max_file_bytes
+        self.max_request_bytes = max_request_bytes
+        self.chunk_size = chunk_size
+        self.total = 0
+        self.saved: List[StoredUpload] = []
+        self._pending: List[Tuple[StoredUpload, Path]] = []
+        self._created: List[StoredUpload] = []
+
+    def consume(self, n: int):
+        self.total += n
+        if self.total > self.max_request_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Суммарный размер файлов больше {self.max_request_bytes // (1024 * 1024)} МБ"
+            )
+
+    def save_sync(self, file: UploadFile) -> StoredUpload:
+        """Для sync-эндпоинтов (они и так выполняются в пуле потоков)"""
+        writer = _AtomicWriter(self, file)
+        try:
+            while chunk := file.file.read(self.chunk_size):
+                writer.write(chunk)
+            stored = writer.commit()
+        except BaseException:
+            writer.abort()
+            raise
+        self._remember(writer, stored)
+        return stored
+
+    async def save(self, file: UploadFile) -> StoredUpload:
+        """Для async-эндпоинтов: чтение и запись не блокируют event loop"""
+        writer = await run_in_threadpool(_AtomicWriter, self, file)
+        try:
+            while chunk := await file.read(self.chunk_size):
+                await run_in_threadpool(writer.write, chunk)
+            stored = await run_in_threadpool(writer.commit)
+        except BaseException:
+            await run_in_threadpool(writer.abort)
+            raise
+        self._remember(writer, stored)
+        return stored
+
+    def _remember(self, writer: _AtomicWriter, stored: StoredUpload):
+        self.saved.append(stored)
+        self._pending.append((stored, writer.tmp_path))
+
+    def as_blobs(self) -> List[tuple]:
+        """Тройки (sha256, size, path) для acquire_blobs"""
+        return [(stored.sha256, stored.size, stored.path) for stored in self.saved]
+
+    def claim(self, db: Session):
+        """
+        В транзакции запроса, до commit: сначала acquire_blobs, затем перенос файлов.
+        Пока строка file_blobs захвачена, collect_garbage не удалит blob, который
+        мы решили переиспользовать, — решение «файл уже есть» принимается под защитой ссылки.
+        """
+        acquire_blobs(db, self.as_blobs())
+        for stored, tmp_path in self._pending:
+            final_path = Path(stored.path)
+            if final_path.exists():
+                tmp_path.unlink(missing_ok=True)
+            else:
+                final_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, final_path)
+                self._created.append(stored)
+        self._pending.clear()
+
+    def rollback(self, db: Session):
+        """
+        После отката транзакции запроса. Перенесённые этим запросом blob'ы удаляются,
+        только если на них так никто и не сослался (см. discard_blobs).
+        """
+        for _stored, tmp_path in self._pending:
+            tmp_path.unlink(missing_ok=True)
+        discard_blobs(db, [(s.sha256, s.size, s.path) for s in self._created])
+        self._pending.clear()
+        self._created.clear()
+        self.saved.clear()
@@ -0,0 +1,51 @@
+# app/core/user_cache.py
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """
+    Снимок пользователя, с которым работают эндпоинты.
+    Не привязан к сессии БД — его можно безопасно хранить в кэше.
+    Собранный из claims токена (AUTH_TOKEN_CLAIMS) содержит только id/email/role/grade:
+    full_name там None, is_verified — False.
+    """
+    id: int
+    email: str
+    role: str
+    grade: Optional[str] = None
+    full_name: Optional[str] = None
+    is_verified: bool = False
+
+    @classmethod
+    def from_model(cls, user) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            role=user.role,
+            grade=user.grade,
+            full_name=user.full_name,
+            is_verified=bool(user.is_verified),
+        )
+
+
+# Кэш пользователей по subject (email) из JWT
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+)
+
+# Текущая users.token_version по id — для проверки claims-токенов
+token_version_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+)
+
+
+def invalidate_user(email: str, user_id: int) -> None:
+    user_cache.invalidate(email)
+    token_version_cache.invalidate(user_id)
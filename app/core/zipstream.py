@@ -0,0 +1,52 @@
+# app/core/zipstream.py
+"""
+ZIP-архив, который собирается на лету и отдаётся по частям:
+без временного файла и без чтения файлов целиком в память.
+zipfile умеет писать в поток без seek (размеры и CRC уходят в data descriptor).
+"""
+import zipfile
+from typing import Iterable, Iterator, Tuple
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkSink:
+    """Поток для zipfile: копит записанные байты до очередной отдачи клиенту"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def stream_zip(entries: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+    """
+    entries — пары (имя в архиве, путь на диске).
+    Уже сжатые форматы (pdf, jpg) почти не ужимаются, поэтому уровень сжатия минимальный.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for arcname, path in entries:
+            with open(path, "rb") as src, zf.open(arcname, mode="w", force_zip64=True) as dest:
+                while chunk := src.read(CHUNK_SIZE):
+                    dest.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # Центральный каталог дописывается при закрытии архива
+    data = sink.drain()
+    if data:
+        yield data
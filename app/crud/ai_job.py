@@ -0,0 +1,112 @@
+# app/crud/ai_job.py
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.ai_job import AIJob
+
+
+def enqueue_ai_job(db: Session, student_task_id: int) -> None:
+    """
+    Ставит работу в очередь в той же транзакции, что и сдачу.
+    Дедупликация: одна строка на работу, повторная сдача сбрасывает её в pending.
+    """
+    values = {
+        "student_task_id": student_task_id,
+        "status": "pending",
+        "attempts": 0,
+        "next_run_at": datetime.utcnow(),
+        "locked_at": None,
+        "last_error": None,
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        job = db.query(AIJob).filter(AIJob.student_task_id == student_task_id).first()
+        if job is None:
+            db.add(AIJob(**values))
+        else:
+            for key, value in values.items():
+                setattr(job, key, value)
+        db.flush()
+        return
+
+    stmt = dialect_insert(AIJob).values(**values, created_at=datetime.utcnow())
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[AIJob.student_task_id],
+        set_={key: stmt.excluded[key] for key in values if key != "student_task_id"},
+    ))
+
+
+async def recover_stale_jobs(db: AsyncSession, expired_only: bool = True) -> int:
+    """
+    running с истёкшей арендой (воркер упал или перезапущен) — обратно в pending.
+    expired_only=False — все running: при старте единственного воркера они точно ничьи.
+    """
+    stmt = update(AIJob).where(AIJob.status == "running")
+    if expired_only:
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.AI_JOB_LEASE_SECONDS)
+        stmt = stmt.where(AIJob.locked_at < cutoff)
+    result = await db.execute(
+        stmt.values(status="pending", locked_at=None, next_run_at=datetime.utcnow())
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def claim_jobs(db: AsyncSession, limit: int) -> List[tuple]:
+    """
+    Забирает до limit готовых задач. Захват — условный UPDATE по статусу,
+    поэтому несколько воркеров (в т.ч. отдельных процессов) не возьмут одну задачу.
+    Возвращает пары (job_id, locked_at): locked_at служит маркером владения.
+    """
+    now = datetime.utcnow()
+    ids = (await db.execute(
+        select(AIJob.id)
+        .where(AIJob.status == "pending", AIJob.next_run_at <= now)
+        .order_by(AIJob.next_run_at)
+        .limit(limit)
+    )).scalars().all()
+
+    claimed = []
+    for job_id in ids:
+        result = await db.execute(
+            update(AIJob)
+            .where(AIJob.id == job_id, AIJob.status == "pending")
+            .values(status="running", locked_at=now, attempts=AIJob.attempts + 1)
+        )
+        if result.rowcount:
+            claimed.append(job_id)
+    await db.commit()
+    return [(job_id, now) for job_id in claimed]
+
+
+async def finish_job(
+    db: AsyncSession,
+    job_id: int,
+    locked_at: datetime,
+    status: str,
+    error: Optional[str] = None,
+    next_run_at: Optional[datetime] = None,
+) -> bool:
+    """
+    Завершает попытку. Если работу пересдали во время анализа, строка уже
+    сброшена в pending (locked_at другой) — тогда ничего не меняем.
+    """
+    values = {"status": status, "locked_at": None, "last_error": error}
+    if next_run_at is not None:
+        values["next_run_at"] = next_run_at
+    result = await db.execute(
+        update(AIJob)
+        .where(AIJob.id == job_id, AIJob.status == "running", AIJob.locked_at == locked_at)
+        .values(**values)
+    )
+    await db.commit()
+    return bool(result.rowcount)
@@ -0,0 +1,226 @@
+# app/crud/file_blob.py
+"""
+Хранилище файлов, адресуемое по SHA-256.
+
+Одинаковое содержимое хранится на диске один раз; записи task_files
+ссылаются на blob через sha256/path, а file_blobs.ref_count считает ссылки.
+Счётчики меняются в той же транзакции, что и записи task_files;
+blob'ы без ссылок удаляет collect_garbage (по крону или вручную:
+python -m app.crud.file_blob).
+
+Файл удаляется с диска только вместе со строкой file_blobs и до commit,
+а загрузка сначала захватывает строку (acquire_blobs) и лишь потом решает,
+переиспользовать ли файл: параллельные удаление и загрузка одного blob'а
+сериализуются на блокировке строки.
+"""
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.file_blob import FileBlob
+from app.db.models.task_file import TaskFile
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = Path(settings.UPLOAD_BLOB_DIR)
+
+
+def blob_path(sha256: str) -> Path:
+    return BLOB_DIR / sha256[:2] / sha256
+
+
+def _dialect_insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+def _insert_released(db: Session, sha256: str, size: int, path: str) -> None:
+    """Строка без ссылок для blob'а, если её ещё нет (её удалит collect_garbage или discard_blobs)"""
+    dialect_insert = _dialect_insert(db)
+    values = {"sha256": sha256, "size": size, "path": path, "ref_count": 0,
+              "released_at": datetime.utcnow()}
+    if dialect_insert is None:
+        if db.get(FileBlob, sha256) is None:
+            db.add(FileBlob(**values))
+            db.flush()
+        return
+    db.execute(dialect_insert(FileBlob).values(**values).on_conflict_do_nothing(
+        index_elements=[FileBlob.sha256]
+    ))
+
+
+def acquire_blobs(db: Session, blobs: Iterable[tuple]) -> None:
+    """
+    Увеличивает счётчики ссылок; blobs — тройки (sha256, size, path).
+    Новые blob'ы вставляются, существующие получают +N одним UPSERT'ом.
+    """
+    counts = Counter()
+    meta = {}
+    for sha256, size, path in blobs:
+        counts[sha256] += 1
+        meta[sha256] = (size, path)
+    if not counts:
+        return
+
+    # Сортировка — единый порядок блокировок строк у параллельных запросов
+    rows = [
+        {"sha256": sha256, "size": meta[sha256][0], "path": meta[sha256][1], "ref_count": n}
+        for sha256, n in sorted(counts.items())
+    ]
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is None:
+        existing = {
+            blob.sha256: blob
+            for blob in db.query(FileBlob).filter(FileBlob.sha256.in_(list(counts)))
+        }
+        for row in rows:
+            blob = existing.get(row["sha256"])
+            if blob:
+                blob.ref_count += row["ref_count"]
+                blob.released_at = None
+            else:
+                db.add(FileBlob(**row))
+        db.flush()
+        return
+
+    for row in rows:
+        stmt = dialect_insert(FileBlob).values(**row)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FileBlob.sha256],
+            set_={
+                "ref_count": FileBlob.ref_count + stmt.excluded.ref_count,
+                "released_at": None,
+            },
+        )
+        db.execute(stmt)
+
+
+def release_blobs(db: Session, sha256s: Iterable[str]) -> None:
+    """Уменьшает счётчики ссылок; blob с нулём ссылок помечается для сборщика мусора"""
+    counts = Counter(sha256 for sha256 in sha256s if sha256)
+    if not counts:
+        return
+    for sha256, n in counts.items():
+        db.query(FileBlob).filter(FileBlob.sha256 == sha256).update(
+            {FileBlob.ref_count: FileBlob.ref_count - n},
+            synchronize_session=False,
+        )
+    db.query(FileBlob).filter(
+        FileBlob.sha256.in_(list(counts)),
+        FileBlob.ref_count <= 0,
+        FileBlob.released_at.is_(None),
+    ).update({FileBlob.released_at: datetime.utcnow()}, synchronize_session=False)
+
+
+def recount_refs(db: Session) -> int:
+    """Пересчитывает ref_count по task_files (на случай рассинхронизации). Возвращает число исправлений."""
+    actual = dict(
+        db.query(TaskFile.sha256, func.count(TaskFile.id))
+        .filter(TaskFile.sha256.isnot(None))
+        .group_by(TaskFile.sha256)
+    )
+    fixed = 0
+    now = datetime.utcnow()
+    for blob in db.query(FileBlob):
+        refs = actual.get(blob.sha256, 0)
+        if blob.ref_count != refs:
+            blob.ref_count = refs
+            fixed += 1
+        if refs == 0 and blob.released_at is None:
+            blob.released_at = now
+        elif refs > 0:
+            blob.released_at = None
+    db.commit()
+    return fixed
+
+
+def collect_garbage(db: Session, grace_seconds: int = settings.BLOB_GC_GRACE_SECONDS) -> int:
+    """
+    Удаляет blob'ы, на которые никто не ссылается дольше grace_seconds,
+    а также файлы в хранилище без записи в file_blobs (брошенные загрузки).
+    Возвращает число удалённых файлов.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    candidates = [
+        sha256 for (sha256,) in db.query(FileBlob.sha256).filter(
+            FileBlob.ref_count <= 0,
+            FileBlob.released_at < cutoff,
+        )
+    ]
+    removed = sum(_delete_unreferenced(db, sha256) for sha256 in candidates)
+
+    if BLOB_DIR.exists():
+        known = {sha256 for (sha256,) in db.query(FileBlob.sha256)}
+        deadline = time.time() - grace_seconds
+        tmp_dir = BLOB_DIR / "tmp"
+        for root, _dirs, files in os.walk(BLOB_DIR):
+            for name in files:
+                path = Path(root) / name
+                if name in known or path.stat().st_mtime >= deadline:
+                    continue
+                if Path(root) == tmp_dir:
+                    path.unlink(missing_ok=True)  # брошенная загрузка
+                    removed += 1
+                else:
+                    # Файл без строки мог быть только что переиспользован загрузкой:
+                    # не удаляем сразу, а заводим строку без ссылок — её удалит
+                    # следующий проход тем же безопасным путём
+                    _insert_released(db, name, path.stat().st_size, str(path))
+                    db.commit()
+
+    if removed:
+        logger.info(f"🧹 [Blobs] Удалено файлов без ссылок: {removed}")
+    return removed
+
+
+def _delete_unreferenced(db: Session, sha256: str) -> bool:
+    """
+    Удаляет строку и файл blob'а, если ссылок нет. Файл удаляется до commit:
+    acquire_blobs параллельной загрузки ждёт на блокировке строки и после
+    commit уже не застанет ни строки, ни файла.
+    """
+    deleted = db.query(FileBlob).filter(
+        FileBlob.sha256 == sha256,
+        FileBlob.ref_count <= 0,
+    ).delete(synchronize_session=False)
+    if deleted:
+        blob_path(sha256).unlink(missing_ok=True)
+    db.commit()
+    return bool(deleted)
+
+
+def discard_blobs(db: Session, blobs: Iterable[tuple]) -> None:
+    """
+    Убирает blob'ы, перенесённые в хранилище откатившимся запросом; blobs — тройки
+    (sha256, size, path). Файл удаляется, только если на него так никто и не сослался:
+    параллельный запрос мог уже переиспользовать его.
+    """
+    for sha256, size, path in sorted(set(blobs)):
+        # Строка нужна как точка блокировки для параллельного acquire_blobs
+        _insert_released(db, sha256, size, path)
+        _delete_unreferenced(db, sha256)
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"✅ Исправлено счётчиков: {recount_refs(db)}")
+        print(f"✅ Удалено файлов: {collect_garbage(db)}")
+    finally:
+        db.close()
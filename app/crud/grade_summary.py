@@ -0,0 +1,205 @@
+# app/crud/grade_summary.py
+"""
+Сводка оценок по ученику и предмету (таблица student_subject_summary).
+
+Затронутые пары (ученик, предмет) пересчитываются одним агрегирующим запросом
+внутри текущей транзакции, до commit. Перед агрегацией пары блокируются
+(см. _lock_pairs): иначе две параллельные транзакции посчитали бы сводку каждая
+по своему снимку, и последний commit затёр бы изменение другой. Полная пересборка:
+    python -m app.crud.grade_summary
+"""
+from typing import Iterable
+
+from sqlalchemy import Integer, String, bindparam, case, func, text, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from app.db.models.grade_summary import StudentSubjectSummary
+from app.db.models.student_task import StudentTask
+from app.db.models.task import Task as TaskModel
+from app.db.models.user import User
+
+COUNTERS = ("assigned_count", "submitted_count", "accepted_count", "rejected_count",
+            "grade_sum", "grade_count")
+
+
+def _aggregate_query(db: Session):
+    status = func.coalesce(StudentTask.status, "assigned")
+    accepted = status == "accepted"
+    return (
+        db.query(
+            StudentTask.student_id,
+            TaskModel.subject,
+            func.sum(case((status == "assigned", 1), else_=0)).label("assigned_count"),
+            func.sum(case((status == "submitted", 1), else_=0)).label("submitted_count"),
+            func.sum(case((accepted, 1), else_=0)).label("accepted_count"),
+            func.sum(case((status == "rejected", 1), else_=0)).label("rejected_count"),
+            func.sum(case((accepted, func.coalesce(StudentTask.grade, 0)), else_=0)).label("grade_sum"),
+            func.sum(case((accepted & StudentTask.grade.isnot(None), 1), else_=0)).label("grade_count"),
+            func.max(case(
+                (accepted, func.coalesce(StudentTask.graded_at, StudentTask.submitted_at)),
+                else_=None,
+            )).label("last_grade_at"),
+        )
+        .join(TaskModel, TaskModel.id == StudentTask.task_id)
+        .filter(StudentTask.student_id.isnot(None))
+        .group_by(StudentTask.student_id, TaskModel.subject)
+    )
+
+
+_PG_LOCK_PAIRS = text(
+    "SELECT count(pg_advisory_xact_lock(t.student_id, hashtext(t.subject)))"
+    " FROM unnest(:student_ids, :subjects) AS t(student_id, subject)"
+).bindparams(
+    bindparam("student_ids", type_=ARRAY(Integer)),
+    bindparam("subjects", type_=ARRAY(String)),
+)
+
+
+def _lock_pairs(db: Session, pairs: set) -> None:
+    """
+    Сериализует пересчёт пар между транзакциями до конца текущей транзакции.
+    PostgreSQL — advisory-блокировка на пару одним запросом, в едином порядке
+    (без взаимоблокировок); следующий агрегирующий запрос в READ COMMITTED
+    уже видит зафиксированные изменения конкурента.
+    SQLite — ничего: после flush транзакция держит блокировку записи всей БД.
+    Прочие СУБД — строки учеников FOR NO KEY UPDATE (не конфликтуют с проверкой FK).
+    """
+    ordered = sorted(pairs)
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        db.execute(_PG_LOCK_PAIRS, {
+            "student_ids": [student_id for student_id, _ in ordered],
+            "subjects": [subject for _, subject in ordered],
+        })
+    elif dialect != "sqlite":
+        student_ids = sorted({student_id for student_id, _ in ordered})
+        db.query(User.id).filter(User.id.in_(student_ids)).order_by(User.id).with_for_update(
+            key_share=True
+        ).all()
+
+
+def refresh_summaries(db: Session, pairs: Iterable[tuple]) -> None:
+    """
+    Пересчитывает сводку для пар (student_id, subject) без commit.
+    Пары, по которым заданий не осталось, удаляются.
+    Пары блокируются до агрегации, поэтому строки можно писать одним UPSERT'ом
+    с абсолютными значениями.
+    """
+    pairs = {(student_id, subject) for student_id, subject in pairs if student_id is not None}
+    if not pairs:
+        return
+    db.flush()
+    _lock_pairs(db, pairs)
+
+    aggregates = {
+        (row.student_id, row.subject): row
+        for row in _aggregate_query(db).filter(
+            tuple_(StudentTask.student_id, TaskModel.subject).in_(list(pairs))
+        )
+    }
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        _refresh_summaries_orm(db, pairs, aggregates)
+        return
+
+    empty = [pair for pair in pairs if pair not in aggregates]
+    if empty:
+        db.query(StudentSubjectSummary).filter(
+            tuple_(StudentSubjectSummary.student_id, StudentSubjectSummary.subject).in_(empty)
+        ).delete(synchronize_session=False)
+    if not aggregates:
+        return
+
+    rows = [
+        {
+            "student_id": student_id,
+            "subject": subject,
+            "last_grade_at": row.last_grade_at,
+            **{counter: int(getattr(row, counter) or 0) for counter in COUNTERS},
+        }
+        for (student_id, subject), row in aggregates.items()
+    ]
+    stmt = dialect_insert(StudentSubjectSummary).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[StudentSubjectSummary.student_id, StudentSubjectSummary.subject],
+        set_={
+            column: getattr(stmt.excluded, column)
+            for column in (*COUNTERS, "last_grade_at")
+        },
+    ))
+
+
+def _refresh_summaries_orm(db: Session, pairs: set, aggregates: dict) -> None:
+    """Запасной путь для СУБД без INSERT ... ON CONFLICT"""
+    existing = {
+        (s.student_id, s.subject): s
+        for s in db.query(StudentSubjectSummary).filter(
+            tuple_(StudentSubjectSummary.student_id, StudentSubjectSummary.subject).in_(list(pairs))
+        )
+    }
+
+    for pair in pairs:
+        row = aggregates.get(pair)
+        summary = existing.get(pair)
+        if row is None:
+            if summary is not None:
+                db.delete(summary)
+            continue
+        if summary is None:
+            summary = StudentSubjectSummary(student_id=pair[0], subject=pair[1])
+            db.add(summary)
+        for counter in COUNTERS:
+            setattr(summary, counter, int(getattr(row, counter) or 0))
+        summary.last_grade_at = row.last_grade_at
+    db.flush()
+
+
+def rebuild_all(db: Session) -> int:
+    """Полная пересборка сводки из student_task и tasks"""
+    db.query(StudentSubjectSummary).delete(synchronize_session=False)
+    rows = _aggregate_query(db).all()
+    db.add_all(
+        StudentSubjectSummary(
+            student_id=row.student_id,
+            subject=row.subject,
+            last_grade_at=row.last_grade_at,
+            **{counter: int(getattr(row, counter) or 0) for counter in COUNTERS},
+        )
+        for row in rows
+    )
+    db.commit()
+    return len(rows)
+
+
+def get_student_summary(db: Session, student_id: int) -> dict:
+    """Сводка ученика по всем предметам — одним запросом по индексу"""
+    summaries = db.query(StudentSubjectSummary).filter(
+        StudentSubjectSummary.student_id == student_id
+    ).all()
+    return {
+        s.subject: {
+            "assigned": s.assigned_count,
+            "submitted": s.submitted_count,
+            "accepted": s.accepted_count,
+            "rejected": s.rejected_count,
+            "average_grade": s.average_grade,
+            "last_grade_at": s.last_grade_at,
+        }
+        for s in summaries
+    }
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"✅ Сводка пересобрана: {rebuild_all(db)} строк")
+    finally:
+        db.close()
@@ -0,0 +1,128 @@
+# app/crud/gradebook.py
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.models.student_task import StudentTask
+from app.db.models.task import Task as TaskModel
+from app.db.models.user import User
+
+# Коды статусов для компактного формата: код = индекс в списке
+CELL_STATUSES = ["not_assigned", "assigned", "submitted", "accepted", "rejected"]
+STATUS_CODES = {status: code for code, status in enumerate(CELL_STATUSES)}
+ALL_SUBJECTS = "Все предметы"
+
+gradebook_cache = TTLCache(maxsize=512, ttl=settings.GRADEBOOK_CACHE_TTL)
+
+
+def _normalize_subject(subject: Optional[str]) -> Optional[str]:
+    return None if not subject or subject == ALL_SUBJECTS else subject
+
+
+def build_gradebook(db: Session, grade: str, teacher_id: int, subject: Optional[str]) -> dict:
+    """
+    Журнал класса: ученики, задания и только «непустые» ячейки
+    (task_index, student_index, status, grade, submission_id).
+    """
+    students = db.query(User.id, User.full_name).filter(
+        User.grade == grade,
+        User.role == "student"
+    ).order_by(User.full_name).all()
+
+    task_query = db.query(TaskModel.id, TaskModel.title, TaskModel.subject, TaskModel.due_date).filter(
+        TaskModel.grade == grade,
+        TaskModel.teacher_id == teacher_id
+    )
+    if subject:
+        task_query = task_query.filter(TaskModel.subject == subject)
+    tasks = task_query.order_by(TaskModel.due_date.desc()).all() if students else []
+
+    student_index = {s.id: i for i, s in enumerate(students)}
+    task_index = {t.id: i for i, t in enumerate(tasks)}
+
+    entries = []
+    if tasks:
+        rows = db.query(
+            StudentTask.id, StudentTask.task_id, StudentTask.student_id,
+            StudentTask.status, StudentTask.grade
+        ).filter(
+            StudentTask.task_id.in_(list(task_index)),
+            StudentTask.student_id.in_(list(student_index))
+        ).all()
+        for st_id, task_id, student_id, status, st_grade in rows:
+            status = status or "assigned"
+            entries.append((
+                task_index[task_id],
+                student_index[student_id],
+                status,
+                st_grade if status == "accepted" else None,
+                st_id,
+            ))
+        entries.sort()
+
+    return {
+        "students": [{"id": s.id, "full_name": s.full_name} for s in students],
+        "tasks": [
+            {"id": t.id, "title": t.title, "subject": t.subject, "due_date": t.due_date}
+            for t in tasks
+        ],
+        "entries": entries,
+    }
+
+
+def get_gradebook(db: Session, grade: str, teacher_id: int, subject: Optional[str]) -> dict:
+    subject = _normalize_subject(subject)
+    key = (grade, teacher_id, subject)
+    gradebook = gradebook_cache.get(key)
+    if gradebook is None:
+        gradebook = build_gradebook(db, grade, teacher_id, subject)
+        gradebook_cache.put(key, gradebook)
+    return gradebook
+
+
+def invalidate_gradebook(grade: Optional[str]) -> None:
+    """Сбрасывает все журналы класса (любой учитель, любой предмет)"""
+    if grade is not None:
+        gradebook_cache.invalidate_where(lambda key: key[0] == grade)
+
+
+def render_cells(gradebook: dict) -> dict:
+    """Прежний формат: cells["{task}-{student}"] для каждой пары задание × ученик"""
+    students, tasks = gradebook["students"], gradebook["tasks"]
+    if not students:
+        return {"students": [], "tasks": [], "cells": {}}
+
+    filled = {(t, s): (status, grade, sub_id) for t, s, status, grade, sub_id in gradebook["entries"]}
+    cells = {}
+    for t, task in enumerate(tasks):
+        for s, student in enumerate(students):
+            status, grade, sub_id = filled.get((t, s), ("not_assigned", None, None))
+            cells[f"{task['id']}-{student['id']}"] = {
+                "status": status,
+                "grade": grade,
+                "submission_id": sub_id,
+            }
+    return {"students": students, "tasks": tasks, "cells": cells}
+
+
+def render_matrix(gradebook: dict) -> dict:
+    """
+    Компактный формат: параллельные массивы только для назначенных ячеек.
+    Отсутствующая пара (task_index, student_index) означает not_assigned.
+    """
+    entries = gradebook["entries"]
+    return {
+        "format": "matrix",
+        "students": gradebook["students"],
+        "tasks": gradebook["tasks"],
+        "statuses": CELL_STATUSES,
+        "cells": {
+            "task_index": [e[0] for e in entries],
+            "student_index": [e[1] for e in entries],
+            "status": [STATUS_CODES.get(e[2], STATUS_CODES["assigned"]) for e in entries],
+            "grade": [e[3] for e in entries],
+            "submission_id": [e[4] for e in entries],
+        },
+    }
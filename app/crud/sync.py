@@ -0,0 +1,226 @@
+# app/crud/sync.py
+"""
+Дельта-синхронизация для клиентов (/api/sync).
+
+Изменённые строки находятся по updated_at (tasks, student_task, attendance),
+удалённые — по sync_tombstones, которые пишутся в той же транзакции, что и удаление.
+Токен — момент начала предыдущей синхронизации; окно берётся с перекрытием
+SYNC_OVERLAP_SECONDS, чтобы не потерять транзакции, закоммиченные позже выдачи токена
+(повторно присланные строки клиент просто перезапишет).
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import task_file as crud_task_file
+from app.db.models.attendance import Attendance
+from app.db.models.student_task import StudentTask
+from app.db.models.sync_tombstone import SyncTombstone
+from app.db.models.task import Task as TaskModel
+
+TASK = "task"
+STUDENT_TASK = "student_task"
+ATTENDANCE = "attendance"
+
+
+def encode_sync_token(ts: datetime) -> str:
+    raw = json.dumps({"ts": ts.isoformat()}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> datetime:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return datetime.fromisoformat(json.loads(base64.urlsafe_b64decode(padded))["ts"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный токен синхронизации")
+
+
+def _insert_tombstones(db: Session, rows: list) -> None:
+    if rows:
+        now = datetime.utcnow()
+        db.execute(insert(SyncTombstone).values([{**row, "deleted_at": now} for row in rows]))
+
+
+def record_task_deletion(db: Session, task: TaskModel, assignments: Iterable[tuple]) -> None:
+    """
+    Задание удалено целиком; assignments — пары (student_task.id, student_id).
+    Учитель получает tombstone задания и работ, каждый ученик — своего задания и своей работы.
+    """
+    assignments = list(assignments)
+    rows = [{"entity": TASK, "entity_id": task.id, "student_id": None,
+             "teacher_id": task.teacher_id, "grade": task.grade}]
+    for st_id, student_id in assignments:
+        rows.append({"entity": TASK, "entity_id": task.id, "student_id": student_id,
+                     "teacher_id": None, "grade": task.grade})
+        rows.append({"entity": STUDENT_TASK, "entity_id": st_id, "student_id": student_id,
+                     "teacher_id": task.teacher_id, "grade": task.grade})
+    _insert_tombstones(db, rows)
+
+
+def record_unassignments(db: Session, task: TaskModel, assignments: Iterable[tuple]) -> None:
+    """Ученики сняты с задания: у учителя пропадает работа, у ученика — и работа, и задание"""
+    rows = []
+    for st_id, student_id in assignments:
+        rows.append({"entity": STUDENT_TASK, "entity_id": st_id, "student_id": student_id,
+                     "teacher_id": task.teacher_id, "grade": task.grade})
+        rows.append({"entity": TASK, "entity_id": task.id, "student_id": student_id,
+                     "teacher_id": None, "grade": task.grade})
+    _insert_tombstones(db, rows)
+
+
+def record_attendance_deletion(db: Session, records: Iterable[tuple]) -> None:
+    """Удалены отметки посещаемости; records — пары (attendance.id, grade)"""
+    _insert_tombstones(db, [
+        {"entity": ATTENDANCE, "entity_id": att_id, "student_id": None, "teacher_id": None, "grade": grade}
+        for att_id, grade in records
+    ])
+
+
+def prune_tombstones(db: Session) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=settings.SYNC_TOMBSTONE_TTL_DAYS)
+    deleted = db.query(SyncTombstone).filter(SyncTombstone.deleted_at < cutoff).delete(
+        synchronize_session=False
+    )
+    db.commit()
+    return deleted
+
+
+def _task_out(task: TaskModel, files: list) -> dict:
+    return {
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "subject": task.subject,
+        "reason": task.reason,
+        "due_date": task.due_date,
+        "grade": task.grade,
+        "teacher_id": task.teacher_id,
+        "enable_ai_analysis": task.enable_ai_analysis,
+        "files": files,
+        "updated_at": task.updated_at,
+    }
+
+
+def _student_task_out(st: StudentTask, files: list, with_ai: bool) -> dict:
+    out = {
+        "id": st.id,
+        "task_id": st.task_id,
+        "student_id": st.student_id,
+        "status": st.status,
+        "comment": st.comment,
+        "grade": st.grade,
+        "teacher_comment": st.teacher_comment,
+        "submitted_at": st.submitted_at,
+        "graded_at": st.graded_at,
+        "student_files": files,
+        "updated_at": st.updated_at,
+    }
+    if with_ai:
+        out["ai_analysis"] = st.ai_analysis
+    return out
+
+
+def _attendance_out(record: Attendance) -> dict:
+    return {
+        "id": record.id,
+        "student_id": record.student_id,
+        "date": record.date,
+        "quarter": record.quarter,
+        "grade": record.grade,
+        "status": record.status,
+        "updated_at": record.updated_at,
+    }
+
+
+def get_changes(db: Session, user, since: Optional[datetime], grade: Optional[str] = None) -> dict:
+    """
+    Изменения с момента since для ученика (свои задания, работы и посещаемость)
+    или учителя (свои задания и работы по ним; посещаемость — если указан grade).
+    since = None или старше срока хранения tombstone'ов — полная выгрузка (reset).
+    """
+    now = datetime.utcnow()
+    reset = since is None or since < now - timedelta(days=settings.SYNC_TOMBSTONE_TTL_DAYS)
+    window = None if reset else since - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+
+    if user.role == "student":
+        task_q = (
+            db.query(TaskModel)
+            .join(StudentTask, StudentTask.task_id == TaskModel.id)
+            .filter(StudentTask.student_id == user.id)
+        )
+        st_q = db.query(StudentTask).filter(StudentTask.student_id == user.id)
+        att_q = db.query(Attendance).filter(Attendance.student_id == user.id)
+        tomb_scope = SyncTombstone.student_id == user.id
+        if window is not None:
+            # Новое назначение тоже приносит ученику задание целиком
+            task_q = task_q.filter(or_(TaskModel.updated_at > window, StudentTask.updated_at > window))
+    elif user.role == "teacher":
+        task_q = db.query(TaskModel).filter(TaskModel.teacher_id == user.id)
+        st_q = (
+            db.query(StudentTask)
+            .join(TaskModel, TaskModel.id == StudentTask.task_id)
+            .filter(TaskModel.teacher_id == user.id)
+        )
+        if grade:
+            task_q = task_q.filter(TaskModel.grade == grade)
+            st_q = st_q.filter(TaskModel.grade == grade)
+            att_q = db.query(Attendance).filter(Attendance.grade == grade)
+            tomb_scope = or_(
+                and_(SyncTombstone.teacher_id == user.id, SyncTombstone.grade == grade),
+                and_(SyncTombstone.entity == ATTENDANCE, SyncTombstone.grade == grade),
+            )
+        else:
+            att_q = None
+            tomb_scope = SyncTombstone.teacher_id == user.id
+        if window is not None:
+            task_q = task_q.filter(TaskModel.updated_at > window)
+    else:
+        raise HTTPException(status_code=403, detail="Только для учеников и учителей")
+
+    if window is not None:
+        st_q = st_q.filter(StudentTask.updated_at > window)
+        if att_q is not None:
+            att_q = att_q.filter(Attendance.updated_at > window)
+
+    tasks = task_q.order_by(TaskModel.id).all()
+    student_tasks = st_q.order_by(StudentTask.id).all()
+    attendance = att_q.order_by(Attendance.id).all() if att_q is not None else []
+
+    task_files = crud_task_file.get_task_file_names(db, [task.id for task in tasks])
+    student_files = crud_task_file.get_submission_file_names(
+        db, [(st.task_id, st.student_id) for st in student_tasks]
+    )
+
+    deleted = {TASK: set(), STUDENT_TASK: set(), ATTENDANCE: set()}
+    if window is not None:
+        rows = db.query(SyncTombstone.entity, SyncTombstone.entity_id).filter(
+            tomb_scope, SyncTombstone.deleted_at > window
+        )
+        for entity, entity_id in rows:
+            deleted[entity].add(entity_id)
+        # Ученика сняли с задания и назначили снова — задание не удалено
+        deleted[TASK] -= {task.id for task in tasks}
+
+    with_ai = user.role == "teacher"
+    return {
+        "token": encode_sync_token(now),
+        "reset": reset,
+        "tasks": [_task_out(task, task_files.get(task.id, [])) for task in tasks],
+        "student_tasks": [
+            _student_task_out(st, student_files.get((st.task_id, st.student_id), []), with_ai)
+            for st in student_tasks
+        ],
+        "attendance": [_attendance_out(record) for record in attendance],
+        "deleted": {
+            "tasks": sorted(deleted[TASK]),
+            "student_tasks": sorted(deleted[STUDENT_TASK]),
+            "attendance": sorted(deleted[ATTENDANCE]),
+        },
+    }
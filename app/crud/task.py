@@ -1,7 +1,55 @@
 # app/crud/task.py
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert, literal, select
 from sqlalchemy.orm import Session
 from app.db.models.task import Task as TaskModel
 from app.db.models.student_task import StudentTask
+from app.db.models.user import User
+from app.crud.grade_summary import refresh_summaries
+from app.crud.sync import record_unassignments
+
+
+def get_student_grades(db: Session, student_ids: Iterable[int]) -> dict:
+    """Классы учеников одним IN-запросом: {student_id: grade}; не-ученики не попадают"""
+    student_ids = list(set(student_ids))
+    if not student_ids:
+        return {}
+    rows = db.query(User.id, User.grade).filter(
+        User.id.in_(student_ids),
+        User.role == "student"
+    )
+    return dict(rows)
+
+
+def _insert_assignments(db: Session, task_id: int, student_ids: Iterable[int]) -> None:
+    """Один многострочный INSERT вместо db.add() на каждого ученика"""
+    rows = [
+        {"task_id": task_id, "student_id": sid, "status": "assigned"}
+        for sid in dict.fromkeys(student_ids)
+    ]
+    if rows:
+        db.execute(insert(StudentTask).values(rows))
+
+
+def _assign_whole_grade(db: Session, task_id: int, grade: str) -> None:
+    """INSERT ... SELECT: всем ученикам класса, у кого ещё нет этого задания"""
+    already = select(StudentTask.id).where(
+        StudentTask.task_id == task_id,
+        StudentTask.student_id == User.id
+    ).exists()
+    db.execute(
+        insert(StudentTask).from_select(
+            ["task_id", "student_id", "status"],
+            select(literal(task_id), User.id, literal("assigned"))
+            .where(User.role == "student", User.grade == grade, ~already)
+        )
+    )
+
+
+def _assigned_student_ids(db: Session, task_id: int) -> list:
+    return [sid for (sid,) in db.query(StudentTask.student_id).filter(StudentTask.task_id == task_id)]
 
 
 def create_task(db: Session, task_data: dict) -> TaskModel:
@@ -16,48 +64,68 @@ def create_task(db: Session, task_data: dict) -> TaskModel:
         enable_ai_analysis=task_data.get("enable_ai_analysis", False)
     )
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    db.flush()  # нужен id задания; коммит — один, в конце
 
-    for student_id in task_data.get("student_ids", []):
-        db_student_task = StudentTask(task_id=db_task.id, student_id=student_id)
-        db.add(db_student_task)
+    if task_data.get("assign_all"):
+        _assign_whole_grade(db, db_task.id, db_task.grade)
+        student_ids = _assigned_student_ids(db, db_task.id)
+        if not student_ids:
+            raise HTTPException(status_code=400, detail="В классе нет учеников")
+    else:
+        student_ids = task_data.get("student_ids", [])
+        _insert_assignments(db, db_task.id, student_ids)
 
+    refresh_summaries(db, [(sid, db_task.subject) for sid in student_ids])
     db.commit()
+    db.refresh(db_task)
     return db_task
 
 
-def update_task(db: Session, task_id: int, task_data: dict) -> TaskModel:
+def update_task(db: Session, task_id: int, task_data: dict) -> Optional[TaskModel]:
     task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
     if not task:
         return None
 
+    assign_all = task_data.pop("assign_all", False)
+
+    # Пары (ученик, предмет) до изменений — для пересчёта сводки
+    existing_records = {st.student_id: st for st in task.student_tasks}
+    affected = {(sid, task.subject) for sid in existing_records}
+
     # 1. Обновляем скалярные поля задачи (title, description и т.д.)
     for key, value in task_data.items():
         if key != "student_ids":
             setattr(task, key, value)
 
     # 2. Обновляем список учеников ТОЛЬКО если он передан
-    if "student_ids" in task_data:
+    if assign_all:
+        # Весь класс: только добавляем недостающих, никого не удаляем
+        _assign_whole_grade(db, task_id, task.grade)
+    elif "student_ids" in task_data:
         new_student_ids = set(task_data["student_ids"])
-        existing_records = {st.student_id: st for st in task.student_tasks}
+
+        # Удаляем учеников, которых убрали из списка — НО ТОЛЬКО ЕСЛИ СТАТУС = 'assigned'
+        removed = [record for sid, record in existing_records.items() if sid not in new_student_ids]
+        for record in removed:
+            if record.status != "assigned":
+                # Ученик уже что-то прислал — нельзя удалить!
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Нельзя удалить ученика {record.student_id}: есть присланная или проверенная работа"
+                )
+        if removed:
+            record_unassignments(db, task, [(record.id, record.student_id) for record in removed])
+            db.query(StudentTask).filter(
+                StudentTask.id.in_([record.id for record in removed])
+            ).delete(synchronize_session=False)
 
         # Добавляем новых учеников (которых ещё нет)
-        for sid in new_student_ids - existing_records.keys():
-            db.add(StudentTask(task_id=task_id, student_id=sid, status="assigned"))
+        _insert_assignments(db, task_id, sorted(new_student_ids - existing_records.keys()))
 
-        # Удаляем учеников, которых убрали из списка — НО ТОЛЬКО ЕСЛИ СТАТУС = 'assigned'
-        for sid, record in existing_records.items():
-            if sid not in new_student_ids:
-                if record.status == "assigned":
-                    db.delete(record)
-                else:
-                    # Ученик уже что-то прислал — нельзя удалить!
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Нельзя удалить ученика {sid}: есть присланная или проверенная работа"
-                    )
+    db.flush()
+    affected |= {(sid, task.subject) for sid in _assigned_student_ids(db, task_id)}
+    refresh_summaries(db, affected)
 
     db.commit()
     db.refresh(task)
-    return task
\ No newline at end of file
+    return task
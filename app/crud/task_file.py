@@ -0,0 +1,103 @@
+# app/crud/task_file.py
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from app.crud.file_blob import release_blobs
+from app.db.models.task_file import TaskFile
+
+
+def add_task_file(
+    db: Session,
+    task_id: int,
+    original_name: str,
+    filename: str,
+    path: str,
+    size: Optional[int] = None,
+    content_type: Optional[str] = None,
+    sha256: Optional[str] = None,
+    student_id: Optional[int] = None,
+) -> TaskFile:
+    """Добавляет запись в индекс; подходит и для Session, и для AsyncSession"""
+    db_file = TaskFile(
+        task_id=task_id,
+        student_id=student_id,
+        original_name=original_name,
+        filename=filename,
+        path=path,
+        size=size,
+        content_type=content_type,
+        sha256=sha256,
+    )
+    db.add(db_file)
+    return db_file
+
+
+def get_task_file(
+    db: Session, task_id: int, filename: str, student_id: Optional[int] = None
+) -> Optional[TaskFile]:
+    """Файл задания (student_id = None) или файл ученика по публичному имени"""
+    query = db.query(TaskFile).filter(
+        TaskFile.task_id == task_id,
+        TaskFile.filename == filename,
+    )
+    if student_id is None:
+        query = query.filter(TaskFile.student_id.is_(None))
+    else:
+        query = query.filter(TaskFile.student_id == student_id)
+    return query.first()
+
+
+def delete_files(db: Session, *criteria) -> int:
+    """Удаляет записи task_files по условиям и освобождает ссылки на их blob'ы"""
+    query = db.query(TaskFile).filter(*criteria)
+    release_blobs(db, [sha256 for (sha256,) in query.with_entities(TaskFile.sha256)])
+    return query.delete(synchronize_session=False)
+
+
+def delete_task_file(db: Session, task_id: int, filename: str) -> int:
+    return delete_files(
+        db,
+        TaskFile.task_id == task_id,
+        TaskFile.student_id.is_(None),
+        TaskFile.filename == filename,
+    )
+
+
+def get_task_file_names(db: Session, task_ids: Iterable[int]) -> dict:
+    """Файлы заданий для пачки заданий одним запросом: {task_id: [filename, ...]}"""
+    task_ids = list(task_ids)
+    files = defaultdict(list)
+    if not task_ids:
+        return files
+    rows = (
+        db.query(TaskFile.task_id, TaskFile.filename)
+        .filter(TaskFile.task_id.in_(task_ids), TaskFile.student_id.is_(None))
+        .order_by(TaskFile.id)
+        .all()
+    )
+    for task_id, filename in rows:
+        files[task_id].append(filename)
+    return files
+
+
+def get_submission_file_names(db: Session, pairs: Iterable[tuple]) -> dict:
+    """
+    Файлы учеников одним запросом: {(task_id, student_id): [filename, ...]}
+    pairs — пары (task_id, student_id).
+    """
+    pairs = list(set(pairs))
+    files = defaultdict(list)
+    if not pairs:
+        return files
+    rows = (
+        db.query(TaskFile.task_id, TaskFile.student_id, TaskFile.filename)
+        .filter(tuple_(TaskFile.task_id, TaskFile.student_id).in_(pairs))
+        .order_by(TaskFile.id)
+        .all()
+    )
+    for task_id, student_id, filename in rows:
+        files[(task_id, student_id)].append(filename)
+    return files
@@ -1,6 +1,9 @@
+import secrets
+import string
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.db.models.user import User
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_pooled, hash_passwords
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
@@ -10,11 +13,16 @@ def get_user_by_id(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
 
+def get_token_version(db: Session, user_id: int):
+    """None — пользователя нет"""
+    return db.query(User.token_version).filter(User.id == user_id).scalar()
+
+
 def create_user(db: Session, user_data):
 
     db_user = User(
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=get_password_hash_pooled(user_data.password),
         full_name=user_data.full_name,
         role=user_data.role,
         grade=user_data.grade
@@ -54,27 +62,82 @@ def generate_student_credentials(grade: str, count: int = 30) -> list:
         })
     return students
 
+# Размер пачки для IN-запросов и многострочных INSERT
+# (держимся ниже лимита параметров SQLite и Postgres)
+BULK_CHUNK_SIZE = 500
+
+
+def _chunks(items: list, size: int = BULK_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _insert_users_ignore_conflicts(db: Session, rows: list) -> set:
+    """
+    Многострочный INSERT ... ON CONFLICT (email) DO NOTHING.
+    Возвращает email'ы, которые действительно были вставлены.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        db.execute(insert(User), rows)
+        return {row["email"] for row in rows}
+
+    stmt = (
+        dialect_insert(User)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.email)
+    )
+    return set(db.execute(stmt).scalars())
+
+
 def create_students_bulk(db: Session, students_data: list):
-    created = []
+    # Убираем повторы внутри самого запроса
+    unique = {}
     for data in students_data:
-        # Проверяем, не существует ли уже
-        existing = db.query(User).filter(User.email == data["email"]).first()
-        if existing:
-            continue  # пропускаем дубликаты
-
-        user = User(
-            email=data["email"],
-            hashed_password=get_password_hash(data["password"]),
-            full_name=data["full_name"],
-            role="student",
-            grade=data["grade"],
-            is_verified=True  # Ученики сразу активны!
+        unique.setdefault(data["email"], data)
+
+    # 1. Один IN-запрос (по пачкам) вместо SELECT на каждого ученика
+    existing = set()
+    for emails in _chunks(list(unique)):
+        existing.update(
+            email for (email,) in db.query(User.email).filter(User.email.in_(emails))
         )
-        db.add(user)
-        created.append({
-            "full_name": data["full_name"],
+    new_students = [data for email, data in unique.items() if email not in existing]
+    if not new_students:
+        return []
+
+    # 2. Хэшируем пароли параллельно
+    hashes = hash_passwords(data["password"] for data in new_students)
+
+    # 3. Многострочная вставка; дубликаты от параллельных запросов пропускаются
+    inserted = set()
+    rows = [
+        {
             "email": data["email"],
-            "password": data["password"]
-        })
+            "hashed_password": hashed_password,
+            "full_name": data["full_name"],
+            "role": "student",
+            "grade": data["grade"],
+            "is_verified": True,  # Ученики сразу активны!
+        }
+        for data, hashed_password in zip(new_students, hashes)
+    ]
+    for chunk in _chunks(rows):
+        inserted |= _insert_users_ignore_conflicts(db, chunk)
     db.commit()
-    return created
\ No newline at end of file
+
+    return [
+        {
+            "full_name": data["full_name"],
+            "email": data["email"],
+            "password": data["password"],
+            "grade": data["grade"],
+        }
+        for data in new_students
+        if data["email"] in inserted
+    ]
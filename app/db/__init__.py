@@ -5,6 +5,12 @@ from app.db.base import Base
 from app.db.models.user import User
 from app.db.models.task import Task
 from app.db.models.student_task import StudentTask
+from app.db.models.attendance import Attendance
+from app.db.models.task_file import TaskFile
+from app.db.models.grade_summary import StudentSubjectSummary
+from app.db.models.file_blob import FileBlob
+from app.db.models.sync_tombstone import SyncTombstone
+from app.db.models.ai_job import AIJob
 
 # Экспортируем Base и модели наружу
-__all__ = ["Base", "User", "Task", "StudentTask"]
\ No newline at end of file
+__all__ = ["Base", "User", "Task", "StudentTask", "Attendance", "TaskFile", "StudentSubjectSummary", "FileBlob", "SyncTombstone", "AIJob"]
\ No newline at end of file
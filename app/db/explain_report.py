@@ -0,0 +1,90 @@
+# app/db/explain_report.py
+"""
+Отчёт с планами выполнения (EXPLAIN) для горячих запросов основных эндпоинтов.
+
+Запуск до и после `alembic upgrade head`, чтобы сравнить планы:
+    python -m app.db.explain_report > before.txt
+    alembic upgrade head
+    python -m app.db.explain_report > after.txt
+"""
+from datetime import date
+
+from sqlalchemy import select
+
+from app.db.models.attendance import Attendance
+from app.db.models.student_task import StudentTask
+from app.db.models.task import Task
+from app.db.models.user import User
+from app.db.session import engine
+
+# Параметры-примеры: на план влияют не значения, а форма запроса
+SAMPLE_GRADE = "10-МАТ"
+SAMPLE_ID = 1
+
+HOT_QUERIES = {
+    "deps.get_current_user": select(User).where(User.email == "student1@school.local"),
+    "students.get_student_tasks_new": (
+        select(StudentTask)
+        .where(StudentTask.student_id == SAMPLE_ID)
+        .order_by(StudentTask.id.desc())
+        .limit(5)
+    ),
+    "students.submit_task": select(StudentTask).where(
+        StudentTask.task_id == SAMPLE_ID,
+        StudentTask.student_id == SAMPLE_ID,
+    ),
+    "tasks.get_tasks_by_grade": (
+        select(Task)
+        .where(Task.grade == SAMPLE_GRADE, Task.teacher_id == SAMPLE_ID)
+        .order_by(Task.id.desc())
+        .limit(10)
+    ),
+    "tasks.get_submissions": (
+        select(StudentTask)
+        .join(Task)
+        .where(StudentTask.status == "submitted", Task.teacher_id == SAMPLE_ID)
+    ),
+    "tasks.get_grades_table (students)": (
+        select(User)
+        .where(User.grade == SAMPLE_GRADE, User.role == "student")
+        .order_by(User.full_name)
+    ),
+    "tasks.get_my_grades": select(StudentTask).where(
+        StudentTask.student_id == SAMPLE_ID,
+        StudentTask.status == "accepted",
+    ),
+    "attendance.get_attendance_for_quarter": select(Attendance).where(
+        Attendance.grade == SAMPLE_GRADE,
+        Attendance.quarter == 1,
+    ),
+    "attendance.update_attendance_record": select(Attendance).where(
+        Attendance.student_id == SAMPLE_ID,
+        Attendance.date == date(2026, 9, 1),
+        Attendance.grade == SAMPLE_GRADE,
+    ),
+}
+
+
+def explain(conn, stmt) -> list[str]:
+    dialect = conn.dialect
+    sql = str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN" if dialect.name == "sqlite" else "EXPLAIN"
+    rows = conn.exec_driver_sql(f"{prefix} {sql}").all()
+    if dialect.name == "sqlite":
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def build_report() -> str:
+    lines = [f"# EXPLAIN report ({engine.dialect.name})", ""]
+    with engine.connect() as conn:
+        for name, stmt in HOT_QUERIES.items():
+            lines.append(f"## {name}")
+            lines.extend(f"    {line}" for line in explain(conn, stmt))
+            lines.append("")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(build_report())
@@ -0,0 +1,27 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from app.db.base import Base
+
+
+class AIJob(Base):
+    """
+    Задача ИИ-анализа работы ученика (очередь в БД, см. app/core/ai_worker.py).
+    Одна строка на работу: повторная сдача переводит её обратно в pending.
+    """
+    __tablename__ = "ai_jobs"
+    __table_args__ = (
+        Index("ix_ai_jobs_status_next_run", "status", "next_run_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_task_id = Column(
+        Integer, ForeignKey("student_task.id", ondelete="CASCADE"), nullable=False, unique=True
+    )
+    # pending — ждёт, running — взята воркером, done — готово, failed — попытки исчерпаны
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = Column(DateTime, nullable=True)  # когда воркер взял задачу (аренда)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,12 +1,18 @@
 # app/db/models/attendance.py
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
-from datetime import date
+from datetime import date, datetime
 
 
 class Attendance(Base):
     __tablename__ = "attendance"
+    __table_args__ = (
+        Index("ix_attendance_grade_quarter", "grade", "quarter"),
+        # Одна отметка на ученика в день в рамках класса
+        Index("uq_attendance_student_date_grade", "student_id", "date", "grade", unique=True),
+        Index("ix_attendance_grade_updated", "grade", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -21,5 +27,6 @@ class Attendance(Base):
     # "absent_unexcused" — отсутствует (неуважительная)
     # "late" — опоздал
     status = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     student = relationship("User", back_populates="attendance_records")
\ No newline at end of file
@@ -0,0 +1,19 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime
+from app.db.base import Base
+
+
+class FileBlob(Base):
+    """
+    Содержимое файла в хранилище, адресуемом по SHA-256 (uploads/blobs/ab/abcd...).
+    ref_count — сколько записей task_files ссылается на этот blob;
+    blob без ссылок удаляет сборщик мусора (app/crud/file_blob.py).
+    """
+    __tablename__ = "file_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    path = Column(String, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    released_at = Column(DateTime, nullable=True)  # когда ссылок стало 0
@@ -0,0 +1,32 @@
+# app/db/models/grade_summary.py
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from app.db.base import Base
+
+
+class StudentSubjectSummary(Base):
+    """
+    Денормализованная сводка по ученику и предмету.
+    Обновляется в той же транзакции, что и сдача/проверка/создание заданий
+    (см. app/crud/grade_summary.py).
+    """
+    __tablename__ = "student_subject_summary"
+    __table_args__ = (
+        Index("uq_student_subject_summary", "student_id", "subject", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    subject = Column(String, nullable=False)
+    assigned_count = Column(Integer, nullable=False, default=0)
+    submitted_count = Column(Integer, nullable=False, default=0)
+    accepted_count = Column(Integer, nullable=False, default=0)
+    rejected_count = Column(Integer, nullable=False, default=0)
+    grade_sum = Column(Integer, nullable=False, default=0)
+    grade_count = Column(Integer, nullable=False, default=0)
+    last_grade_at = Column(DateTime, nullable=True)
+
+    @property
+    def average_grade(self):
+        if not self.grade_count:
+            return None
+        return round(self.grade_sum / self.grade_count, 2)
@@ -1,10 +1,17 @@
 # app/db/models/student_task.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
 class StudentTask(Base):
     __tablename__ = "student_task"
+    __table_args__ = (
+        # Одна работа на пару (задание, ученик); индекс покрывает поиск по task_id
+        Index("uq_student_task_task_student", "task_id", "student_id", unique=True),
+        Index("ix_student_task_student_status", "student_id", "status"),
+        Index("ix_student_task_student_updated", "student_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"))
@@ -14,7 +21,9 @@ class StudentTask(Base):
     grade = Column(Integer, nullable=True)
     teacher_comment = Column(Text, nullable=True)
     submitted_at = Column(DateTime, nullable=True)
+    graded_at = Column(DateTime, nullable=True)  # когда учитель принял/отклонил работу
     ai_analysis = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     # Связи
     task = relationship("Task", back_populates="student_tasks")
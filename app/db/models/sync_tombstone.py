@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from app.db.base import Base
+
+
+class SyncTombstone(Base):
+    """
+    Запись об удалённой строке для /api/sync: клиент по ней убирает объект у себя.
+    student_id / teacher_id / grade — кому эта запись адресована.
+    Старые записи удаляются (prune_tombstones), клиент со слишком старым
+    токеном получает полную выгрузку.
+    """
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (
+        Index("ix_sync_tombstones_deleted_at", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String, nullable=False)  # "task" | "student_task" | "attendance"
+    entity_id = Column(Integer, nullable=False)
+    student_id = Column(Integer, nullable=True)
+    teacher_id = Column(Integer, nullable=True)
+    grade = Column(String, nullable=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
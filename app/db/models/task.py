@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_grade_teacher", "grade", "teacher_id"),
+        Index("ix_tasks_teacher_updated", "teacher_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -15,7 +20,10 @@ class Task(Base):
     grade = Column(String, nullable=False)
     teacher_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     enable_ai_analysis = Column(Boolean, default=False, nullable=False)
+    # Меняется при любом UPDATE задания (и при изменении его файлов) — для опроса ленты
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     # Связи
     teacher = relationship("User", back_populates="created_tasks")
-    student_tasks = relationship("StudentTask", back_populates="task", cascade="all, delete-orphan")
\ No newline at end of file
+    student_tasks = relationship("StudentTask", back_populates="task", cascade="all, delete-orphan")
+    files = relationship("TaskFile", back_populates="task", cascade="all, delete-orphan")
\ No newline at end of file
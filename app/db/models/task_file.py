@@ -1,14 +1,25 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
 class TaskFile(Base):
+    """
+    Индекс вложений: файлы задания (student_id = NULL)
+    и файлы, присланные учеником в ответ на задание.
+    """
     __tablename__ = "task_files"
+    __table_args__ = (
+        Index("ix_task_files_task_student", "task_id", "student_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # None — файл учителя
     original_name = Column(String, nullable=False)
     filename = Column(String, nullable=False)  # безопасное имя
     path = Column(String, nullable=False)  # путь на диске
+    size = Column(BigInteger, nullable=True)
+    content_type = Column(String, nullable=True)
+    sha256 = Column(String(64), nullable=True)
 
-    task = relationship("Task", back_populates="files")
\ No newline at end of file
+    task = relationship("Task", back_populates="files")
@@ -1,11 +1,14 @@
 # app/db/models/user.py
-from sqlalchemy import Column, Integer, String, DateTime,Boolean
+from sqlalchemy import Column, Integer, String, DateTime,Boolean, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from datetime import datetime
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_role_grade", "role", "grade"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -14,6 +17,8 @@ class User(Base):
     role = Column(String, nullable=False)  # "student", "teacher"
     grade = Column(String, nullable=True)  # только для учеников
     is_verified = Column(Boolean, default=False)
+    # Растёт при смене класса/пароля, подтверждении — отзывает выданные claims-токены
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     # Связи
     created_tasks = relationship("Task", back_populates="teacher")
     student_tasks = relationship("StudentTask", back_populates="student")  # ← ОБЯЗАТЕЛЬНО
@@ -1,13 +1,88 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def async_database_url(url: str) -> str:
+    """postgresql:// → postgresql+asyncpg://, sqlite:// → sqlite+aiosqlite://"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+def engine_options(url: str) -> dict:
+    """Параметры пула из настроек (одни и те же для sync и async движков)"""
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if is_sqlite(url) and make_url(url).database in (None, "", ":memory:"):
+        # In-memory SQLite живёт в одном соединении — пул не настраиваем
+        return options
+    if make_url(url).get_driver_name() == "aiosqlite":
+        # Для aiosqlite по умолчанию NullPool — явно включаем пул
+        options["poolclass"] = AsyncAdaptedQueuePool
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    return options
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL позволяет читать во время записи, busy_timeout ждёт блокировку
+    вместо мгновенного "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        if settings.SQLITE_WAL:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        if settings.SQLITE_MMAP_SIZE:
+            cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    finally:
+        cursor.close()
+
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+if is_sqlite(settings.DATABASE_URL):
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок для async-эндпоинтов: запросы не блокируют event loop
+ASYNC_DATABASE_URL = async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+if is_sqlite(ASYNC_DATABASE_URL):
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,10 +1,35 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 # Импортируем из app.api, а не из app.routers!
-from app.api import auth, tasks, students, ai, admin, attendance, admin_stats
+from app.api import auth, tasks, students, ai, admin, attendance, admin_stats, sync, events
+from app.core.config import settings
+from app.core.security import shutdown_hash_executor
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.storage_cleanup import start_storage_worker, stop_storage_worker
+from app.core.events import broker
+from app.core.ai_worker import start_ai_worker, stop_ai_worker
+from app.core.http_clients import open_http_clients, close_http_clients
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_http_clients()
+    start_storage_worker()
+    await start_ai_worker()
+    try:
+        yield
+    finally:
+        await stop_ai_worker()
+        await stop_storage_worker()
+        broker.close_all()
+        await close_http_clients()
+        shutdown_hash_executor()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,7 +44,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=(
+        ["X-DB-Query-Count", "X-DB-Time-Ms", "X-DB-Repeated-Queries"]
+        if settings.QUERY_STATS_ENABLED and settings.QUERY_STATS_HEADERS else []
+    ),
 )
+app.add_middleware(QueryStatsMiddleware)
 
 # Подключаем admin_stats с префиксом /api/admin
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
@@ -28,6 +58,8 @@ app.include_router(students.router, prefix="/api/students", tags=["students"])
 app.include_router(ai.router, prefix="/api/ai", tags=["ai"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 app.include_router(attendance.router, prefix="/api/attendance", tags=["attendance"])
+app.include_router(sync.router, prefix="/api/sync", tags=["sync"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
 
 # 👇 Вот так правильно:
 app.include_router(admin_stats.router, prefix="/api/admin", tags=["admin"])
\ No newline at end of file
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 
 class TaskCreateRequest(BaseModel):
@@ -9,9 +9,10 @@ class TaskCreateRequest(BaseModel):
     subject: str
     reason: str
     due_date: Optional[datetime] = None
-    student_ids: List[int]
+    student_ids: List[int] = []
     grade: str
     enable_ai_analysis: bool = False
+    assign_all: bool = False  # назначить всему классу grade, student_ids не нужны
 
 
 class TaskUpdateRequest(BaseModel):
@@ -20,8 +21,9 @@ class TaskUpdateRequest(BaseModel):
     subject: str
     reason: str
     due_date: Optional[datetime] = None
-    student_ids: List[int]
+    student_ids: Optional[List[int]] = None  # None — список учеников не меняется
     enable_ai_analysis: bool = False
+    assign_all: bool = False  # добавить всех учеников класса задания
 
 
 class Task(BaseModel):
@@ -58,4 +60,14 @@ class TaskWithSubmissionStatus(BaseModel):
     student_files: List[str] = []
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class SubmissionBulkItem(BaseModel):
+    submission_id: int
+    action: Literal["accept", "reject"]
+    grade: Optional[int] = None
+    comment: Optional[str] = None
+
+
+class SubmissionBulkRequest(BaseModel):
+    items: List[SubmissionBulkItem] = Field(..., min_length=1, max_length=500)
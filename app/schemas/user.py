@@ -1,4 +1,4 @@
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, validator
 from typing import Optional, List
 
 class UserCreate(BaseModel):
@@ -47,13 +47,31 @@ class UserOut(BaseModel):
 
 
 
+MAX_GENERATED_STUDENTS_PER_GRADE = 200
+
 class StudentGenerationRequest(BaseModel):
-    grade: str
+    grade: Optional[str] = None
+    # Несколько классов за один запрос (например, вся школа в начале года)
+    grades: List[str] = []
+    count: int = Field(default=30, ge=1, le=MAX_GENERATED_STUDENTS_PER_GRADE)
+
+    @validator("grades", always=True)
+    def grade_or_grades_required(cls, v, values):
+        if not v and not values.get("grade"):
+            raise ValueError("Укажите 'grade' или 'grades'")
+        return v
+
+    def all_grades(self) -> List[str]:
+        grades = list(self.grades)
+        if self.grade and self.grade not in grades:
+            grades.insert(0, self.grade)
+        return grades
 
 class GeneratedStudent(BaseModel):
     full_name: str
     email: str
     password: str
+    grade: Optional[str] = None
 
 class StudentGenerationResponse(BaseModel):
     students: List[GeneratedStudent]
\ No newline at end of file
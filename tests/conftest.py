@@ -0,0 +1,71 @@
+# tests/conftest.py
+"""
+Общие фикстуры. Тесты идут на SQLite во временном каталоге; переменные окружения
+выставляются до импорта app — настройки и движок БД создаются при импорте.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="school-tests-")
+atexit.register(shutil.rmtree, _TMP_DIR, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/test.db"
+os.environ["UPLOAD_BLOB_DIR"] = os.path.join(_TMP_DIR, "blobs")
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+for _name in (
+    "GEN_API_TOKEN", "LNO_API_BASE_URL", "LNO_USERNAME", "LNO_PASSWORD",
+    "LNO_ZDEKH_USERNAME", "LNO_ZDEKH_PASSWORD", "LNO_VASILIEVA_USERNAME", "LNO_VASILIEVA_PASSWORD",
+):
+    os.environ.setdefault(_name, "test")
+
+import pytest
+
+from app.core.user_cache import token_version_cache, user_cache
+from app.db import Base, User
+from app.db.models.student_task import StudentTask
+from app.db.models.task import Task as TaskModel
+from app.db.session import SessionLocal, async_engine, engine
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+        user_cache.clear()
+        token_version_cache.clear()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def dispose_async_engine():
+    """Соединения aiosqlite живут в своих потоках — закрываем их в том же event loop"""
+    yield
+    await async_engine.dispose()
+
+
+def make_user(db, email: str, role: str = "student", grade: str = None) -> User:
+    user = User(email=email, full_name=email, hashed_password="x", role=role,
+                grade=grade, is_verified=True)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_task(db, teacher: User, students, subject: str = "math", grade: str = "10-МАТ") -> TaskModel:
+    task = TaskModel(title="t", description="d", subject=subject, reason="homework",
+                     grade=grade, teacher_id=teacher.id)
+    db.add(task)
+    db.flush()
+    db.add_all(StudentTask(task_id=task.id, student_id=student.id, status="assigned") for student in students)
+    db.commit()
+    return task
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core import ai_worker
+from app.core.ai_service import AIServiceError
+from app.core.config import settings
+from app.crud.ai_job import claim_jobs, enqueue_ai_job, finish_job, recover_stale_jobs
+from app.db.models.ai_job import AIJob
+from app.db.models.student_task import StudentTask
+from app.db.session import AsyncSessionLocal
+from tests.conftest import make_task, make_user
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("dispose_async_engine")]
+
+
+@pytest.fixture
+def job_id(db):
+    teacher = make_user(db, "t@x", role="teacher")
+    student = make_user(db, "s@x", grade="10-МАТ")
+    task = make_task(db, teacher, [student])
+    st_id = db.query(StudentTask.id).filter_by(task_id=task.id).scalar()
+    enqueue_ai_job(db, st_id)
+    db.commit()
+    return db.query(AIJob.id).scalar()
+
+
+def _job(db) -> AIJob:
+    db.expire_all()
+    return db.query(AIJob).one()
+
+
+async def _claim(limit: int = 10) -> list:
+    async with AsyncSessionLocal() as adb:
+        return await claim_jobs(adb, limit)
+
+
+async def _finish(job_id, locked_at, status, **kwargs) -> bool:
+    async with AsyncSessionLocal() as adb:
+        return await finish_job(adb, job_id, locked_at, status, **kwargs)
+
+
+async def test_job_is_claimed_once(db, job_id):
+    claimed = await _claim()
+
+    assert [job for job, _ in claimed] == [job_id]
+    assert await _claim() == []
+    job = _job(db)
+    assert (job.status, job.attempts) == ("running", 1)
+
+
+async def test_finish_requires_matching_lease(db, job_id):
+    [(_, locked_at)] = await _claim()
+
+    assert await _finish(job_id, locked_at - timedelta(seconds=1), "done") is False
+    assert await _finish(job_id, locked_at, "done") is True
+    assert (_job(db).status, _job(db).locked_at) == ("done", None)
+
+
+async def test_resubmission_during_analysis_discards_result(db, job_id):
+    [(_, locked_at)] = await _claim()
+
+    enqueue_ai_job(db, _job(db).student_task_id)  # ученик пересдал работу
+    db.commit()
+
+    assert await _finish(job_id, locked_at, "done") is False
+    job = _job(db)
+    assert (job.status, job.attempts) == ("pending", 0)
+
+
+async def test_backoff_delay_grows_exponentially_up_to_cap(monkeypatch):
+    monkeypatch.setattr(settings, "AI_JOB_BACKOFF_BASE_SECONDS", 10.0)
+    monkeypatch.setattr(settings, "AI_JOB_BACKOFF_MAX_SECONDS", 60.0)
+
+    assert [ai_worker.backoff_delay(n) for n in range(1, 6)] == [10.0, 20.0, 40.0, 60.0, 60.0]
+
+
+async def test_retryable_error_is_rescheduled_then_fails(db, job_id, monkeypatch):
+    async def unavailable(**kwargs):
+        raise AIServiceError("503", retryable=True)
+
+    monkeypatch.setattr(ai_worker, "analyze_and_save_ai", unavailable)
+    monkeypatch.setattr(settings, "AI_JOB_MAX_ATTEMPTS", 2)
+    worker = ai_worker.AIWorker()
+
+    [(_, locked_at)] = await _claim()
+    started = datetime.utcnow()
+    await worker._run_job(job_id, locked_at)
+    job = _job(db)
+    assert (job.status, job.last_error, job.locked_at) == ("pending", "503", None)
+    assert job.next_run_at >= started + timedelta(seconds=ai_worker.backoff_delay(1))
+    assert await _claim() == []  # задержка ещё не прошла
+
+    job.next_run_at = datetime.utcnow()
+    db.commit()
+    [(_, locked_at)] = await _claim()
+    await worker._run_job(job_id, locked_at)
+    job = _job(db)
+    assert (job.status, job.attempts) == ("failed", 2)
+
+
+async def test_recovery_respects_lease_unless_recovering_all(db, job_id):
+    await _claim()
+
+    async with AsyncSessionLocal() as adb:
+        assert await recover_stale_jobs(adb) == 0
+    async with AsyncSessionLocal() as adb:
+        assert await recover_stale_jobs(adb, expired_only=False) == 1
+    job = _job(db)
+    assert (job.status, job.locked_at) == ("pending", None)
@@ -0,0 +1,71 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.deps import decode_token_payload, principal_from_token
+from app.core.config import settings
+from app.core.security import create_access_token, create_stream_token
+from app.core.user_cache import invalidate_user
+from tests.conftest import make_user
+
+
+@pytest.fixture(autouse=True)
+def claims_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_TOKEN_CLAIMS", True)
+
+
+def test_claims_token_resolves_without_user_row_lookup(db):
+    student = make_user(db, "s@x", grade="10-МАТ")
+    token = create_access_token({"sub": student.email}, user=student)
+
+    principal = principal_from_token(db, token)
+
+    assert (principal.id, principal.role, principal.grade) == (student.id, "student", "10-МАТ")
+
+
+def test_bumped_token_version_revokes_claims_token(db):
+    student = make_user(db, "s@x", grade="10-МАТ")
+    token = create_access_token({"sub": student.email}, user=student)
+    principal_from_token(db, token)  # версия попала в кэш
+
+    student.token_version += 1
+    db.commit()
+    invalidate_user(student.email, student.id)
+
+    with pytest.raises(HTTPException) as exc:
+        principal_from_token(db, token)
+    assert exc.value.status_code == 401
+    fresh = create_access_token({"sub": student.email}, user=student)
+    assert principal_from_token(db, fresh).id == student.id
+
+
+def test_deleted_user_claims_token_is_rejected(db):
+    student = make_user(db, "s@x", grade="10-МАТ")
+    token = create_access_token({"sub": student.email}, user=student)
+    user_id = student.id
+    db.delete(student)
+    db.commit()
+    invalidate_user("s@x", user_id)
+
+    with pytest.raises(HTTPException):
+        principal_from_token(db, token)
+
+
+def test_token_without_version_falls_back_to_database(db):
+    teacher = make_user(db, "t@x", role="teacher")
+    token = create_access_token({"sub": teacher.email})
+
+    principal = principal_from_token(db, token)
+
+    assert principal.id == teacher.id and principal.full_name == teacher.full_name
+
+
+def test_stream_token_is_not_an_access_token(db):
+    student = make_user(db, "s@x", grade="10-МАТ")
+    stream_token = create_stream_token(student)
+    access_token = create_access_token({"sub": student.email}, user=student)
+
+    assert decode_token_payload(stream_token, scope="sse")["sub"] == student.email
+    with pytest.raises(HTTPException):
+        principal_from_token(db, stream_token)
+    with pytest.raises(HTTPException):
+        decode_token_payload(access_token, scope="sse")
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+from app.crud.file_blob import (
+    acquire_blobs, blob_path, collect_garbage, discard_blobs, recount_refs, release_blobs,
+)
+from app.db.models.file_blob import FileBlob
+from app.db.models.task_file import TaskFile
+from tests.conftest import make_task, make_user
+
+
+def _store(content: bytes) -> tuple:
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = blob_path(sha256)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return sha256, len(content), str(path)
+
+
+def _blob(db, sha256: str):
+    db.expire_all()
+    return db.get(FileBlob, sha256)
+
+
+@pytest.fixture
+def blobs(db):
+    a, b = _store(b"a" * 10), _store(b"b" * 20)
+    yield a, b
+    for sha256, _, _ in (a, b):
+        blob_path(sha256).unlink(missing_ok=True)
+
+
+def test_acquire_counts_every_reference(db, blobs):
+    a, b = blobs
+    acquire_blobs(db, [a, a, b])
+    db.commit()
+    acquire_blobs(db, [a])
+    db.commit()
+
+    assert _blob(db, a[0]).ref_count == 3
+    assert _blob(db, b[0]).ref_count == 1
+
+
+def test_release_marks_unreferenced_blob(db, blobs):
+    a, _ = blobs
+    acquire_blobs(db, [a, a])
+    db.commit()
+
+    release_blobs(db, [a[0]])
+    db.commit()
+    assert (_blob(db, a[0]).ref_count, _blob(db, a[0]).released_at) == (1, None)
+
+    release_blobs(db, [a[0], None])
+    db.commit()
+    assert _blob(db, a[0]).ref_count == 0
+    assert _blob(db, a[0]).released_at is not None
+
+    acquire_blobs(db, [a])  # повторная загрузка того же содержимого
+    db.commit()
+    assert (_blob(db, a[0]).ref_count, _blob(db, a[0]).released_at) == (1, None)
+
+
+def test_collect_garbage_removes_only_unreferenced(db, blobs):
+    a, b = blobs
+    acquire_blobs(db, [a, b])
+    db.commit()
+    release_blobs(db, [b[0]])
+    db.commit()
+
+    assert collect_garbage(db, grace_seconds=3600) == 0  # ещё в льготном периоде
+    assert blob_path(b[0]).exists()
+
+    assert collect_garbage(db, grace_seconds=0) == 1
+    assert _blob(db, b[0]) is None and not blob_path(b[0]).exists()
+    assert _blob(db, a[0]).ref_count == 1 and blob_path(a[0]).exists()
+
+
+def test_collect_garbage_adopts_orphan_file_before_removing(db, blobs):
+    a, _ = blobs
+    old = time.time() - 120
+    os.utime(blob_path(a[0]), (old, old))
+
+    # Первый проход только заводит строку без ссылок, второй удаляет её вместе с файлом
+    collect_garbage(db, grace_seconds=60)
+    assert _blob(db, a[0]).ref_count == 0 and blob_path(a[0]).exists()
+    blob = _blob(db, a[0])
+    blob.released_at = blob.released_at.replace(year=blob.released_at.year - 1)
+    db.commit()
+
+    assert collect_garbage(db, grace_seconds=60) == 1
+    assert _blob(db, a[0]) is None and not blob_path(a[0]).exists()
+
+
+def test_discard_keeps_blob_reused_by_another_request(db, blobs):
+    a, b = blobs
+    acquire_blobs(db, [a])
+    db.commit()
+
+    discard_blobs(db, [a, b])
+
+    assert blob_path(a[0]).exists() and _blob(db, a[0]).ref_count == 1
+    assert not blob_path(b[0]).exists() and _blob(db, b[0]) is None
+
+
+def test_recount_refs_follows_task_files(db, blobs):
+    a, b = blobs
+    teacher = make_user(db, "t@x", role="teacher")
+    task = make_task(db, teacher, [])
+    db.add_all(
+        TaskFile(task_id=task.id, original_name="f", filename="f", path=path, size=size, sha256=sha256)
+        for sha256, size, path in (a, a)
+    )
+    acquire_blobs(db, [a, b])
+    db.commit()
+
+    assert recount_refs(db) == 2
+    assert _blob(db, a[0]).ref_count == 2
+    assert _blob(db, b[0]).ref_count == 0 and _blob(db, b[0]).released_at is not None
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+import pytest
+
+from app.crud.grade_summary import COUNTERS, rebuild_all, refresh_summaries
+from app.db.models.grade_summary import StudentSubjectSummary
+from app.db.models.student_task import StudentTask
+from tests.conftest import make_task, make_user
+
+
+@pytest.fixture(params=["sqlite", "fallback"])
+def dialect(request, db, monkeypatch):
+    """fallback — СУБД без INSERT ... ON CONFLICT: имя диалекта подменяется, SQL остаётся SQLite"""
+    if request.param == "fallback":
+        monkeypatch.setattr(db.get_bind().dialect, "name", "mssql")
+    return request.param
+
+
+def _snapshot(db) -> dict:
+    db.expire_all()
+    return {
+        (s.student_id, s.subject): (*(getattr(s, counter) for counter in COUNTERS), s.last_grade_at)
+        for s in db.query(StudentSubjectSummary)
+    }
+
+
+def _rebuilt(db) -> dict:
+    rebuild_all(db)
+    return _snapshot(db)
+
+
+@pytest.fixture
+def school(db):
+    teacher = make_user(db, "t@x", role="teacher")
+    s1 = make_user(db, "s1@x", grade="10-МАТ")
+    s2 = make_user(db, "s2@x", grade="10-МАТ")
+    math = [make_task(db, teacher, [s1, s2]) for _ in range(3)]
+    physics = make_task(db, teacher, [s1], subject="physics")
+    return teacher, s1, s2, math, physics
+
+
+def _set_status(db, task, student, status, grade=None):
+    st = db.query(StudentTask).filter_by(task_id=task.id, student_id=student.id).one()
+    st.status = status
+    st.grade = grade
+    if status == "accepted":
+        st.graded_at = datetime(2026, 10, task.id)
+
+
+def test_refresh_matches_rebuild(db, dialect, school):
+    _, s1, s2, math, physics = school
+    _set_status(db, math[0], s1, "accepted", 5)
+    _set_status(db, math[1], s1, "accepted", 4)
+    _set_status(db, math[2], s1, "submitted")
+    _set_status(db, math[0], s2, "rejected")
+    _set_status(db, physics, s1, "accepted")  # принята без оценки
+    pairs = [(s1.id, "math"), (s2.id, "math"), (s1.id, "physics")]
+    refresh_summaries(db, pairs)
+    db.commit()
+
+    incremental = _snapshot(db)
+
+    assert incremental == _rebuilt(db)
+    assert incremental[(s1.id, "math")][:6] == (0, 1, 2, 0, 9, 2)
+    assert incremental[(s1.id, "math")][6] == datetime(2026, 10, math[1].id)
+
+
+def test_refresh_touches_only_given_pairs(db, dialect, school):
+    _, s1, s2, math, _ = school
+    refresh_summaries(db, [(s1.id, "math"), (s2.id, "math"), (s1.id, "physics")])
+    db.commit()
+
+    _set_status(db, math[0], s1, "accepted", 3)
+    refresh_summaries(db, [(s1.id, "math")])
+    db.commit()
+
+    assert _snapshot(db) == _rebuilt(db)
+
+
+def test_refresh_removes_pairs_without_tasks(db, dialect, school):
+    _, s1, s2, math, physics = school
+    refresh_summaries(db, [(s1.id, "math"), (s2.id, "math"), (s1.id, "physics")])
+    db.commit()
+
+    db.query(StudentTask).filter(StudentTask.task_id == physics.id).delete()
+    refresh_summaries(db, [(s1.id, "physics")])
+    db.commit()
+
+    summary = _snapshot(db)
+    assert (s1.id, "physics") not in summary
+    assert summary == _rebuilt(db)
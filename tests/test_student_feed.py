@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from fastapi import Response
+from starlette.requests import Request
+
+from app.api.students import get_student_tasks_new
+from app.core.user_cache import CurrentUser
+from app.db.models.student_task import StudentTask
+from tests.conftest import make_task, make_user
+
+
+def _feed(db, student, if_none_match=None, **params):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    request = Request({"type": "http", "method": "GET", "headers": headers})
+    response = Response()
+    principal = CurrentUser(id=student.id, email=student.email, role="student", grade=student.grade)
+    params = {"page": 1, "size": 5, "cursor": None, "with_total": False, "updated_since": None, **params}
+    result = get_student_tasks_new(request, response, db=db, current_user=principal, **params)
+    if isinstance(result, Response):
+        return result.status_code, result.headers["etag"], None
+    return 200, response.headers["etag"], result
+
+
+def test_unchanged_feed_answers_304(db):
+    teacher = make_user(db, "t@x", role="teacher")
+    student = make_user(db, "s@x", grade="10-МАТ")
+    task = make_task(db, teacher, [student])
+
+    status, etag, body = _feed(db, student)
+    assert status == 200 and [item["id"] for item in body["items"]] == [task.id]
+    assert _feed(db, student, if_none_match=etag)[0] == 304
+
+    st = db.query(StudentTask).filter_by(student_id=student.id).one()
+    st.status = "submitted"
+    db.commit()
+    status, new_etag, body = _feed(db, student, if_none_match=etag)
+    assert status == 200 and new_etag != etag
+    assert body["items"][0]["status"] == "submitted"
+
+
+def test_updated_since_returns_only_changed_tasks(db):
+    teacher = make_user(db, "t@x", role="teacher")
+    student = make_user(db, "s@x", grade="10-МАТ")
+    old, fresh = make_task(db, teacher, [student]), make_task(db, teacher, [student])
+    since = datetime.utcnow() - timedelta(minutes=1)
+    for row in (old, *db.query(StudentTask).filter_by(task_id=old.id)):
+        row.updated_at = since - timedelta(minutes=1)
+    db.commit()
+
+    _, _, body = _feed(db, student, updated_since=since)
+
+    assert [item["id"] for item in body["items"]] == [fresh.id]
+    assert body["total"] == 1
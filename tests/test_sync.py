@@ -0,0 +1,141 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.api.admin import delete_student
+from app.core.config import settings
+from app.core.user_cache import CurrentUser
+from app.crud.sync import (
+    decode_sync_token, get_changes, record_task_deletion, record_unassignments,
+)
+from app.db.models.attendance import Attendance
+from app.db.models.student_task import StudentTask
+from app.db.models.sync_tombstone import SyncTombstone
+from app.db.models.task import Task as TaskModel
+from tests.conftest import make_task, make_user
+
+
+@pytest.fixture
+def school(db):
+    teacher = make_user(db, "t@x", role="teacher")
+    s1 = make_user(db, "s1@x", grade="10-МАТ")
+    s2 = make_user(db, "s2@x", grade="10-МАТ")
+    task = make_task(db, teacher, [s1, s2])
+    return teacher, s1, s2, task
+
+
+def _since(changes: dict) -> datetime:
+    return decode_sync_token(changes["token"])
+
+
+def _backdate(db, seconds: float) -> None:
+    """Сдвигает в прошлое всё, что уже записано, — вместо ожидания"""
+    delta = timedelta(seconds=seconds)
+    for row in db.query(TaskModel).all() + db.query(StudentTask).all():
+        row.updated_at -= delta
+    for tombstone in db.query(SyncTombstone):
+        tombstone.deleted_at -= delta
+    db.commit()
+
+
+def test_first_sync_is_full_reset(db, school):
+    teacher, s1, _, task = school
+
+    changes = get_changes(db, s1, None)
+
+    assert changes["reset"] is True
+    assert [t["id"] for t in changes["tasks"]] == [task.id]
+    assert [st["student_id"] for st in changes["student_tasks"]] == [s1.id]
+    assert changes["deleted"] == {"tasks": [], "student_tasks": [], "attendance": []}
+
+
+def test_overlap_window_resends_recent_rows(db, school, monkeypatch):
+    _, s1, _, task = school
+    since = _since(get_changes(db, s1, None))
+    # Строки закоммичены за 30 с до выдачи токена
+    _backdate(db, 30)
+
+    monkeypatch.setattr(settings, "SYNC_OVERLAP_SECONDS", 60)
+    changes = get_changes(db, s1, since)
+    assert changes["reset"] is False
+    assert [t["id"] for t in changes["tasks"]] == [task.id]
+    assert [st["student_id"] for st in changes["student_tasks"]] == [s1.id]
+
+    monkeypatch.setattr(settings, "SYNC_OVERLAP_SECONDS", 10)
+    changes = get_changes(db, s1, since)
+    assert changes["tasks"] == [] and changes["student_tasks"] == []
+
+
+def test_unassignment_reaches_student_and_teacher(db, school, monkeypatch):
+    teacher, s1, s2, task = school
+    monkeypatch.setattr(settings, "SYNC_OVERLAP_SECONDS", 0)
+    _backdate(db, 30)
+    since = datetime.utcnow()
+    st_id = db.query(StudentTask.id).filter_by(task_id=task.id, student_id=s2.id).scalar()
+
+    record_unassignments(db, task, [(st_id, s2.id)])
+    db.query(StudentTask).filter(StudentTask.id == st_id).delete()
+    db.commit()
+
+    assert get_changes(db, s2, since)["deleted"] == {"tasks": [task.id], "student_tasks": [st_id], "attendance": []}
+    assert get_changes(db, teacher, since)["deleted"]["student_tasks"] == [st_id]
+    assert get_changes(db, s1, since)["deleted"] == {"tasks": [], "student_tasks": [], "attendance": []}
+
+
+def test_reassigned_task_is_not_reported_deleted(db, school, monkeypatch):
+    teacher, s1, s2, task = school
+    monkeypatch.setattr(settings, "SYNC_OVERLAP_SECONDS", 0)
+    _backdate(db, 30)
+    since = datetime.utcnow()
+    st_id = db.query(StudentTask.id).filter_by(task_id=task.id, student_id=s2.id).scalar()
+
+    record_unassignments(db, task, [(st_id, s2.id)])
+    db.query(StudentTask).filter(StudentTask.id == st_id).delete()
+    db.add(StudentTask(task_id=task.id, student_id=s2.id, status="assigned"))
+    db.commit()
+
+    changes = get_changes(db, s2, since)
+    assert [t["id"] for t in changes["tasks"]] == [task.id]
+    assert changes["deleted"]["tasks"] == [] and changes["deleted"]["student_tasks"] == [st_id]
+
+
+def test_task_deletion_reaches_everyone(db, school, monkeypatch):
+    teacher, s1, s2, task = school
+    monkeypatch.setattr(settings, "SYNC_OVERLAP_SECONDS", 0)
+    _backdate(db, 30)
+    since = datetime.utcnow()
+    assignments = db.query(StudentTask.id, StudentTask.student_id).filter_by(task_id=task.id).all()
+
+    record_task_deletion(db, task, assignments)
+    db.query(StudentTask).delete()
+    db.delete(task)
+    db.commit()
+
+    st_ids = {student_id: st_id for st_id, student_id in assignments}
+    assert get_changes(db, teacher, since)["deleted"]["tasks"] == [task.id]
+    assert sorted(get_changes(db, teacher, since)["deleted"]["student_tasks"]) == sorted(st_ids.values())
+    assert get_changes(db, s1, since)["deleted"]["student_tasks"] == [st_ids[s1.id]]
+
+
+def test_deleted_student_leaves_tombstones(db, school, monkeypatch):
+    teacher, s1, _, task = school
+    monkeypatch.setattr(settings, "SYNC_OVERLAP_SECONDS", 0)
+    db.add(Attendance(student_id=s1.id, date=date(2026, 10, 1), quarter=1, grade="10-МАТ", status="present"))
+    db.commit()
+    _backdate(db, 30)
+    since = datetime.utcnow()
+    st_id = db.query(StudentTask.id).filter_by(task_id=task.id, student_id=s1.id).scalar()
+    att_id = db.query(Attendance.id).scalar()
+
+    delete_student(s1.id, db=db, current_user=CurrentUser(id=0, email="admin@x", role="admin"))
+
+    assert db.query(StudentTask).filter(StudentTask.id == st_id).count() == 0
+    deleted = get_changes(db, teacher, since, grade="10-МАТ")["deleted"]
+    assert deleted == {"tasks": [], "student_tasks": [st_id], "attendance": [att_id]}
+
+
+def test_token_older_than_tombstones_forces_reset(db, school):
+    _, s1, _, _ = school
+    since = datetime.utcnow() - timedelta(days=settings.SYNC_TOMBSTONE_TTL_DAYS + 1)
+
+    assert get_changes(db, s1, since)["reset"] is True